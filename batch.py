@@ -0,0 +1,102 @@
+import sys
+import os
+import time
+import argparse
+import multiprocessing
+from functools import partial
+from collections import Counter
+import hjson
+from gui import randomize, loadCache
+from ROM import GAMES, VANILLA, patchPath
+
+# Parsed vanilla archives, keyed by (game, romfs path).
+# Filled in the parent before forking so workers share them.
+VANILLAS = {}
+
+def getVanilla(settings):
+    key = (settings['game'], settings['rom'])
+    if key not in VANILLAS:
+        vanilla = VANILLA(settings['rom'])
+        vanilla.loadAll(GAMES[settings['game']].ARCHIVES.values())
+        VANILLAS[key] = vanilla
+    return VANILLAS[key]
+
+def worker(settings, timings=False, cache=None):
+    start = time.perf_counter()
+    try:
+        vanilla = getVanilla(settings)
+        success = randomize(settings, vanilla, timings, cache)
+        error = None if success else 'randomizing failed'
+    except Exception as e:
+        success = False
+        error = f"{type(e).__name__}: {e}"
+    return settings['seed'], success, time.perf_counter() - start, error
+
+def parseSeeds(seeds):
+    first, _, last = seeds.partition('-')
+    return range(int(first), int(last or first) + 1)
+
+def loadJobs(args):
+    if args.jsonl:
+        with open(args.jsonl, 'r') as file:
+            return [hjson.loads(line) for line in file if line.strip()]
+    with open(args.settings, 'r') as file:
+        settings = hjson.load(file)
+    return [{**settings, 'seed': seed} for seed in parseSeeds(args.seeds)]
+
+# Folders more than one job would write to, e.g. the same seed with
+# different settings
+def sharedOutputs(jobs):
+    paths = Counter(patchPath(settings) for settings in jobs if 'game' in settings and 'seed' in settings)
+    return sorted(path for path, count in paths.items() if count > 1)
+
+def batch(jobs, workers=None, timings=False, cache=None):
+    # Workers inherit the vanilla data when forking; otherwise each loads it once
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods:
+        for settings in jobs:
+            try:
+                getVanilla(settings)
+            except Exception:
+                pass # Reported by the worker for that seed
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+
+    results = []
+    with context.Pool(workers) as pool:
+        for result in pool.imap_unordered(partial(worker, timings=timings, cache=cache), jobs):
+            seed, success, seconds, error = result
+            status = 'ok' if success else f"FAILED ({error})"
+            print(f"seed {seed}: {status} in {seconds:.2f}s")
+            results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Randomize many seeds at once.')
+    parser.add_argument('settings', nargs='?', help='settings file used for every seed')
+    parser.add_argument('--seeds', help='seed or seed range, e.g. 1-100')
+    parser.add_argument('--jsonl', help='file with one settings object per line')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: all cores)')
+    parser.add_argument('--timings', action='store_true', help='write a timings report next to each patch')
+    parser.add_argument('--cache', help='reuse patches already made with the same settings, kept in this folder')
+    parser.add_argument('--cache-size', type=int, default=512, help='cache size in MB (default: 512)')
+    args = parser.parse_args()
+    if not args.jsonl and not (args.settings and args.seeds):
+        parser.error('give either a settings file with --seeds, or --jsonl')
+
+    jobs = loadJobs(args)
+    shared = sharedOutputs(jobs)
+    if shared:
+        parser.error(f"several jobs would write to {', '.join(map(os.path.basename, shared))}; give each job of a game its own seed")
+    start = time.perf_counter()
+    cache = loadCache(args.cache, args.cache_size << 20) if args.cache else None
+    results = batch(jobs, args.workers, args.timings, cache)
+    failed = [seed for seed, success, _, _ in results if not success]
+    print(f"{len(results) - len(failed)}/{len(results)} seeds done in {time.perf_counter() - start:.2f}s")
+    if failed:
+        print('Failed seeds:', ', '.join(map(str, sorted(failed))))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
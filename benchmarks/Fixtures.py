@@ -0,0 +1,280 @@
+# Synthetic romfs archives for benchmarks. Tables have the shapes the
+# randomizer expects (columns, ids, text pools) but made-up contents.
+import os
+import random
+import zlib
+from Classes import buildTable
+
+# Encode strings into a text block; returns the block and each string's offset
+def buildText(strings):
+    offsets = {}
+    data = bytearray()
+    for string in strings:
+        if string not in offsets:
+            offsets[string] = len(data)
+            data += string.encode('utf-16-le') + bytes(2)
+    return bytes(data), [offsets[s] for s in strings]
+
+# Table with named columns placed at their indices; text columns hold strings
+def buildFile(numCols, count, cols, texts={}):
+    table = [[0]*count for _ in range(numCols)]
+    for col, values in cols.items():
+        table[col][:len(values)] = values
+    textData = b''
+    strings = []
+    for col, values in texts.items():
+        strings += values
+    textData, offsets = buildText(strings)
+    for col, values in texts.items():
+        table[col] = offsets[:len(values)] + [0]*(count - len(values))
+        offsets = offsets[len(values):]
+    return buildTable(table, textData=textData)
+
+# Write index.fs/crowd.fs; about 3/4 of the files get compressed
+def writeCrowd(path, files, rng):
+    os.makedirs(path, exist_ok=True)
+    indexData = bytearray()
+    crowdData = bytearray()
+    for i, (fileName, data) in enumerate(files.items()):
+        if rng.random() < 0.75:
+            data = ((len(data) << 8) + 0x60).to_bytes(4, 'little') + zlib.compress(data)[2:-4]
+        name = fileName.encode()
+        entry = len(crowdData).to_bytes(4, 'little') + len(data).to_bytes(4, 'little')
+        entry += zlib.crc32(name).to_bytes(4, 'little') + name + b'\x00'
+        entry += bytes(-len(entry) % 4)
+        pointer = len(indexData) + 4 + len(entry) if i < len(files)-1 else 0
+        indexData += pointer.to_bytes(4, 'little') + entry
+        crowdData += data + bytes(-len(data) % 4)
+    with open(os.path.join(path, 'index.fs'), 'wb') as file:
+        file.write(indexData)
+    with open(os.path.join(path, 'crowd.fs'), 'wb') as file:
+        file.write(crowdData)
+
+
+# Archives of a fake romfs, keyed by their path in it
+class FIXTURE:
+    def __init__(self, path, seed=0):
+        self.path = path
+        self.rng = random.Random(seed)
+        self.archives = {}
+
+    def write(self):
+        for archive, files in self.archives.items():
+            if archive.endswith('.btb'):
+                fileName = os.path.join(self.path, archive)
+                os.makedirs(os.path.dirname(fileName), exist_ok=True)
+                with open(fileName, 'wb') as file:
+                    file.write(files)
+            else:
+                writeCrowd(os.path.join(self.path, archive), files, self.rng)
+
+    # Items: spells (50000+), filler, a unique Teleport Stone, key items
+    def items(self, costCol, magicIds):
+        ids = list(range(1, 200)) + magicIds + [90001, 90002]
+        names = [f"Item {i}" for i in ids]
+        names[0] = 'Teleport Stone'
+        names[1] = 'Dummy'
+        for i, id in enumerate(ids):
+            if id >= 50000 and id < 90000:
+                names[i] = f"Spell {id}"
+        rng = self.rng
+        return buildFile(costCol+2, len(ids), {
+            0: ids,
+            3: [rng.randrange(1000) for _ in ids],
+            11: [rng.randrange(100) for _ in ids],
+            costCol: [rng.randrange(10, 5000) for _ in ids],
+            costCol+1: [rng.randrange(5, 2500) for _ in ids],
+        }, {4: names})
+
+    def commandAbilities(self, ids):
+        return buildFile(6, len(ids), {0: ids}, {4: [f"Command {i}" for i in ids]})
+
+    def supportAbilities(self, ids, nameCol, costCol):
+        rng = self.rng
+        return buildFile(costCol+1, len(ids), {
+            0: ids,
+            2: [rng.randrange(30) for _ in ids],
+            costCol: [rng.randrange(1, 6) for _ in ids],
+        }, {nameCol: [f"Support {i}" for i in ids]})
+
+    def jobCommands(self, ids, nameCol):
+        return buildFile(nameCol+1, len(ids), {0: ids}, {nameCol: [f"Job Command {i}" for i in ids]})
+
+    # Spells by level; abilities are command abilities, items are spells
+    def magic(self, abilIds, itemIds, levels):
+        return buildFile(4, len(levels), {0: levels, 1: abilIds, 2: itemIds})
+
+    def detailInfo(self, comIds):
+        return buildFile(3, len(comIds), {0: comIds}, {2: [f"Enables use of:\n{'.'*150} {i}" for i in comIds]})
+
+    def pcLevels(self):
+        return buildFile(4, 99, {0: list(range(1, 100)), 1: list(range(0, 99000, 1000)), 2: [1000]*99})
+
+    def monsters(self, numCols, count=300):
+        rng = self.rng
+        return buildFile(numCols, count, {c: [rng.randrange(1000) for _ in range(count)] for c in range(numCols)})
+
+    def shops(self, magicIds, names):
+        files = {'ShopMasterTable_Magic.spb': buildTable([magicIds, [0]*len(magicIds)])}
+        for name in names:
+            files[f"{name}_Magic.spb"] = buildTable([magicIds[:8], [0]*8])
+            files[f"{name}_Item.spb"] = buildTable([list(range(1, 20)), [0]*19])
+        return files
+
+    # Job level tables: specialty in row 0, abilities by level
+    def jobLevels(self, numJobs, commands, supports, numCols, jobComCol):
+        rng = self.rng
+        commands = list(commands)
+        supports = list(supports)
+        files = {}
+        for job in range(numJobs):
+            abilities = [commands.pop(), commands.pop(), supports.pop(), supports.pop()]
+            abilities += [0]*(14 - len(abilities))
+            cols = {
+                0: list(range(1, 15)),
+                1: [rng.randrange(100, 9999) for _ in range(14)],
+                2: [rng.randrange(100, 999) for _ in range(14)],
+                12: [supports.pop()],
+                13: abilities,
+                jobComCol: [2001 + job % 6]*14,
+            }
+            for col in range(4, 12):
+                cols[col] = [rng.randrange(50, 150)]*14
+            files[f"JobTable{job:02d}.btb"] = buildFile(numCols, 14, cols)
+        return files
+
+
+class FIXTURE_BD(FIXTURE):
+    def __init__(self, path, seed=0):
+        super().__init__(path, seed)
+        magicIds = list(range(50000, 50218))
+        commands = list(range(1, 100))
+        magicAbils = list(range(100, 200))
+        supports = list(range(1000, 1100))
+        jobComs = list(range(2001, 2069))
+        rng = self.rng
+
+        parameter = {
+            'ItemTable.btb': self.items(17, magicIds + list(range(50500, 50700))),
+            'CommandAbility.btb': self.commandAbilities(commands + magicAbils),
+            'SupportAbility.btb': self.supportAbilities(supports, 3, 5),
+            'JobCommand.btb': self.jobCommands(jobComs, 1),
+            'JobTable.btb': buildFile(4, 24, {1: list(range(24))[::-1]}, {2: [f"Job {i}" for i in range(24)]}),
+        }
+        parameter.update(self.jobLevels(24, commands, supports, 17, 16))
+        # Black/White/Time mage spells & Spell Fencer: 2 spells per level 1-7
+        levels = [l for l in range(1, 8) for _ in range(2)]
+        abils = iter(magicAbils)
+        spells = {}
+        for fileName in ['AbilityWMG.btb', 'AbilityBMG.btb', 'AbilityTMG.btb']:
+            spells[fileName] = ([next(abils) for _ in levels], [50000 + len(spells)*100 + i for i in range(len(levels))])
+            parameter[fileName] = self.magic(*spells[fileName], levels)
+        # Spell Fencer shares some black mage spells
+        sfLevels = [l for l in range(1, 7)]
+        sfItems = spells['AbilityBMG.btb'][1][:6]
+        parameter['AbilityMGS.btb'] = self.magic([next(abils) for _ in sfLevels], sfItems, sfLevels)
+        smLevels = [l for l in range(1, 7) for _ in range(2)]
+        parameter['AbilitySMG.btb'] = self.magic(list(range(75, 87)), [50500 + i for i in range(12)], smLevels)
+        parameter['AbilitySMU.btb'] = self.magic(list(range(1, 13)), [50600 + i for i in range(12)], smLevels)
+        wbm = spells['AbilityWMG.btb'][0][:4] + spells['AbilityBMG.btb'][0][:4]
+        wbmItems = spells['AbilityWMG.btb'][1][:4] + spells['AbilityBMG.btb'][1][:4]
+        parameter['AbilityWBM.btb'] = self.magic(wbm, wbmItems, [1, 2, 3, 4]*2)
+        parameter['DetailInfoMagicTable.btb'] = self.detailInfo(jobComs)
+        for i in range(1, 5):
+            parameter[f"PcLevelTable00{i}.btb"] = self.pcLevels()
+
+        treasures = {'TreasureMessageTable.btb': buildFile(2, 10, {0: list(range(10))})}
+        locations = ['EV_10', 'EV_15'] + [f"ND_{i}" for i in range(10, 34)] + [f"TW_{i}" for i in range(10, 21) if i != 15]
+        items = list(range(3, 199))
+        for location in locations:
+            count = rng.randrange(8, 15)
+            cols = {
+                1: [rng.choice(items) for _ in range(count)],
+                2: [0]*count,
+                3: [rng.randrange(1, 4) for _ in range(count)],
+            }
+            cols[1][0], cols[2][0], cols[3][0] = 0, rng.randrange(100, 5000), 0
+            cols[1][-1], cols[3][-1] = 90001, 1
+            treasures[f"{location}.trb"] = buildFile(5, count + 2, cols)
+
+        self.archives = {
+            'Common_en/Paramater': parameter,
+            'Common_en/TreasureTable': treasures,
+            'Common_en/Battle': {'MonsterData.btb': self.monsters(94), 'BattleMisc.btb': self.monsters(8)},
+            'Common_en/Shop': self.shops(magicIds, ['TW_10', 'TW_11', 'ND_31']),
+        }
+
+
+class FIXTURE_BS(FIXTURE):
+    jobNames = [
+        'Freelancer', 'Knight', 'Black Mage', 'White Mage', 'Monk', 'Ranger',
+        'Ninja', 'Time Mage', 'Swordmaster', 'Pirate', 'Dark Knight', 'Templar',
+        'Summoner', 'Valkyrie', 'Red Mage', 'Thief', 'Merchant', 'Performer',
+        'Fencer', 'Bishop', 'Wizard', 'Charioteer', 'Catmancer', 'Astrologian',
+        'Hawkeye', 'Patissier', 'Exorcist', 'Guardian', 'Yōkai', 'Kaiser',
+    ]
+
+    def __init__(self, path, seed=0):
+        super().__init__(path, seed)
+        magicIds = list(range(50000, 50700))
+        commands = list(range(10000, 10100))
+        magicAbils = list(range(11000, 11200))
+        supports = list(range(20000, 20100)) + [20103, 20201, 20402, 20502, 20901, 21002, 21201, 21701, 22101, 22404, 22502, 23002, 23003]
+        jobComs = list(range(2001, 2100))
+        rng = self.rng
+
+        ability = {
+            'CommandAbility.btb': self.commandAbilities(commands + magicAbils),
+            'SupportAbility.btb': self.supportAbilities(supports, 4, 6),
+            'JobCommand.btb': self.jobCommands(jobComs, 2),
+        }
+        abils = iter(magicAbils)
+        spells = {}
+        levels = [l for l in range(1, 8) for _ in range(2)]
+        for i, fileName in enumerate(['AbilityBMG.btb', 'AbilityWMG.btb', 'AbilityTMG.btb', 'AbilityBIS.btb', 'AbilityAST.btb']):
+            spells[fileName] = ([next(abils) for _ in levels], [50000 + 100*i + j for j in range(len(levels))])
+            ability[fileName] = self.magic(*spells[fileName], levels)
+        ability['AbilityWIZ.btb'] = self.magic([next(abils) for _ in range(4)], [50500 + j for j in range(4)], [1]*4)
+        smLevels = [1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 5, 5, 5, 5, 5, 5]
+        ability['AbilitySMG.btb'] = self.magic([next(abils) for _ in smLevels], [50600 + j for j in range(16)], smLevels)
+        wbm = [spells[f][j][:4] for j in range(2) for f in ['AbilityWMG.btb', 'AbilityBMG.btb']]
+        ability['AbilityWBM.btb'] = self.magic(wbm[0] + wbm[1], wbm[2] + wbm[3], [1, 2, 3, 4]*2)
+        ability['AbilityFOX.btb'] = self.magic([next(abils) for _ in range(3)], [0]*3, [1, 2, 3])
+
+        job = {}
+        aptitudes = {col: [rng.choice([100, 120, 140, 160, 180, 200]) for _ in self.jobNames] for col in range(9, 26)}
+        for col in aptitudes:
+            aptitudes[col][0] = 200
+        job['JobTable.btb'] = buildFile(26, len(self.jobNames), aptitudes, {2: self.jobNames})
+        job.update(self.jobLevels(len(self.jobNames), commands, supports, 16, 14))
+
+        pc = {f"PcLevelTable00{i}.btb": self.pcLevels() for i in range(1, 7)}
+
+        self.archives = {
+            'Common_en/Parameter/Item/ItemTable.btb': self.items(19, magicIds),
+            'Common_en/Parameter/Ability': ability,
+            'Common_en/Parameter/Job': job,
+            'Common_en/Shop': self.shops(magicIds, ['TW_10', 'TW_11', 'ND_31']),
+            'Common_en/Parameter/Pc': pc,
+            'Common_en/Battle': {'MonsterData.btb': self.monsters(117)},
+            'Common_en/Parameter/DetailInfo': {'DetailInfoMagicTable.btb': self.detailInfo(jobComs)},
+        }
+
+
+# One crowd of generic tables, for benchmarking the binary layer
+class FIXTURE_CROWD(FIXTURE):
+    def __init__(self, path, seed=0, numFiles=200, numCols=32, count=200, numStrings=50):
+        super().__init__(path, seed)
+        rng = self.rng
+        files = {}
+        for i in range(numFiles):
+            cols = {c: [rng.randrange(-1000, 100000) for _ in range(count)] for c in range(numCols-1)}
+            strings = [f"String {rng.randrange(numStrings)} of table {i}" for _ in range(count)]
+            files[f"Table{i:04d}.btb"] = buildFile(numCols, count, cols, {numCols-1: strings})
+        self.archives = {'Crowd': files}
+
+
+FIXTURES = {
+    'BD': FIXTURE_BD,
+    'BS': FIXTURE_BS,
+}
@@ -0,0 +1,237 @@
+import sys
+import os
+import io
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from collections import Counter
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCHMARKS, '..'))
+sys.path.append(os.path.join(BENCHMARKS, '..', 'src'))
+from Classes import CROWD
+from ROM import BD, BS, VANILLA, patchPath
+from Output import DIRECTORY
+from Fixtures import FIXTURES, FIXTURE_CROWD
+
+ROMS = {'BD': BD, 'BS': BS}
+BASELINE = os.path.join(BENCHMARKS, 'baselines', 'baseline.json')
+
+SETTINGS = {
+    'jobs-commands': True,
+    'jobs-magic': True,
+    'jobs-specialties': True,
+    'jobs-support': True,
+    'jobs-support-costs': True,
+    'jobs-stat-affinities': True,
+    'qol-exp': 2,
+    'qol-jp': 4,
+    'qol-pg': 2,
+    'qol-teleport-stones': True,
+    'qol-mastered-jobs': True,
+}
+
+# Best time of a few repeats; setup isn't timed
+def measure(func, setup=None, repeat=5):
+    best = None
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+class BENCHMARKS_CROWD:
+    def __init__(self, path):
+        self.path = os.path.join(path, 'Crowd')
+        FIXTURE_CROWD(path).write()
+        self.crowd = CROWD(self.path)
+        self.crowd.prefetch()
+        self.dataFiles = list(self.crowd.dataFiles.values())
+
+    def split(self):
+        crowd = CROWD(self.path)
+        crowd.prefetch()
+
+    def splitLazy(self):
+        crowd = CROWD(self.path)
+        for fileName in list(crowd.crowdFiles)[:10]:
+            crowd.crowdFiles[fileName]
+
+    # Every file patched, so everything gets recompressed
+    def dirtyClone(self):
+        crowd = self.crowd.clone()
+        for dataFile in crowd.crowdFiles.values():
+            dataFile.patchValue(dataFile.readValue(0, 0) + 1, 0, 0)
+        return (crowd,)
+
+    def join(self, crowd):
+        crowd.joinCrowd()
+
+    def readCols(self):
+        for dataFile in self.dataFiles:
+            for col in range(dataFile.stride // 4):
+                dataFile.readCol(col)
+
+    def readValues(self):
+        for dataFile in self.dataFiles[:20]:
+            for row in range(dataFile.count):
+                for col in range(8):
+                    dataFile.readValue(row, col)
+
+    def clones(self):
+        return ([dataFile.clone() for dataFile in self.dataFiles],)
+
+    def patchCols(self, dataFiles):
+        for dataFile in dataFiles:
+            for col in range(8):
+                dataFile.patchCol([col]*dataFile.count, col)
+
+    def patchValues(self, dataFiles):
+        for dataFile in dataFiles[:20]:
+            for row in range(dataFile.count):
+                dataFile.patchValue(row, row, 0)
+
+    # Decode each text block from its bytes, not the cached TEXT
+    def decodeText(self):
+        for dataFile in self.dataFiles:
+            dataFile.text = None
+            dataFile.getText().getStrings()
+
+    def readTextStrings(self):
+        for dataFile in self.dataFiles:
+            dataFile.text = None
+            dataFile.readTextStringAll(dataFile.stride//4 - 1)
+
+    # Short edits to the strings only one row points at, all fitting in place
+    def patchTextStrings(self, dataFiles):
+        for dataFile in dataFiles:
+            col = dataFile.stride//4 - 1
+            offsets = dataFile.readCol(col)
+            refs = Counter(offsets)
+            edits = [('x', row, col) for row, offset in enumerate(offsets) if refs[offset] == 1]
+            dataFile.patchTextStrings(edits, [col])
+
+    def checkTextStrings(self):
+        dataFiles, = self.clones()
+        sizes = [dataFile.textSize for dataFile in dataFiles]
+        self.patchTextStrings(dataFiles)
+        assert [dataFile.textSize for dataFile in dataFiles] == sizes, 'Strings that fit were moved!'
+
+    def run(self, repeat):
+        self.checkTextStrings()
+        return {
+            'crowd.split': measure(self.split, repeat=repeat),
+            'crowd.splitLazy': measure(self.splitLazy, repeat=repeat),
+            'crowd.join': measure(self.join, self.dirtyClone, repeat=repeat),
+            'datafile.readCols': measure(self.readCols, repeat=repeat),
+            'datafile.readValues': measure(self.readValues, repeat=repeat),
+            'datafile.patchCols': measure(self.patchCols, self.clones, repeat=repeat),
+            'datafile.patchValues': measure(self.patchValues, self.clones, repeat=repeat),
+            'text.decode': measure(self.decodeText, repeat=repeat),
+            'text.readStrings': measure(self.readTextStrings, repeat=repeat),
+            'text.patchStrings': measure(self.patchTextStrings, self.clones, repeat=repeat),
+        }
+
+
+# Whole randomizer runs on a fake romfs, from scratch and with the
+# vanilla archives already parsed
+class BENCHMARKS_ROM:
+    def __init__(self, path, game):
+        self.game = game
+        self.path = os.path.join(path, game, 'romfs')
+        self.out = os.path.join(path, game, 'out')
+        FIXTURES[game](self.path, seed=3).write()
+        os.mkdir(self.out)
+        self.settings = {
+            **SETTINGS,
+            'rom': self.path,
+            'game': game,
+            'seed': 1,
+            'jobs-equip-aptitudes': game == 'BS',
+            'treasures': game == 'BD',
+        }
+        self.vanilla = VANILLA(self.path)
+        self.vanilla.loadAll(ROMS[game].ARCHIVES.values())
+
+    # A fresh output each time, unless incremental
+    def run(self, vanilla=None, settings=None, incremental=False):
+        settings = settings or self.settings
+        cwd = os.getcwd()
+        os.chdir(self.out)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                output = None if incremental else DIRECTORY(patchPath(settings))
+                rom = ROMS[self.game](settings, vanilla, output)
+                rom.run()
+        finally:
+            os.chdir(cwd)
+
+    def runVanilla(self):
+        self.run(self.vanilla)
+
+    def previousPatch(self):
+        self.runVanilla()
+        return ()
+
+    # Only the battle rewards change from the previous patch
+    def runIncremental(self):
+        self.run(self.vanilla, {**self.settings, 'qol-exp': 4}, incremental=True)
+
+    def results(self, repeat):
+        return {
+            f"rom.{self.game}": measure(self.run, repeat=repeat),
+            f"rom.{self.game}.vanilla": measure(self.runVanilla, repeat=repeat),
+            f"rom.{self.game}.incremental": measure(self.runIncremental, self.previousPatch, repeat=repeat),
+        }
+
+
+def compare(results, baseline, threshold):
+    slower = []
+    for name, seconds in results.items():
+        if name not in baseline:
+            print(f"{name:28s} {seconds*1000:10.2f} ms")
+            continue
+        ratio = seconds / baseline[name]
+        flag = ''
+        if ratio > threshold:
+            flag = '  SLOWER'
+            slower.append(name)
+        print(f"{name:28s} {seconds*1000:10.2f} ms  {ratio:6.2f}x baseline{flag}")
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the randomizer on synthetic archives.')
+    parser.add_argument('--baseline', default=BASELINE, help='JSON file of baseline timings')
+    parser.add_argument('--save', action='store_true', help='overwrite the baseline with these results')
+    parser.add_argument('--repeat', type=int, default=5, help='repeats per benchmark (best is kept)')
+    parser.add_argument('--threshold', type=float, default=1.25, help='ratio over baseline reported as a slowdown')
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp()
+    try:
+        results = BENCHMARKS_CROWD(path).run(args.repeat)
+        for game in ROMS:
+            results.update(BENCHMARKS_ROM(path, game).results(args.repeat))
+    finally:
+        shutil.rmtree(path)
+
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+    slower = compare(results, baseline, args.threshold)
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print('Saved', args.baseline)
+    elif slower:
+        sys.exit(f"Slower than baseline: {', '.join(slower)}")
+
+if __name__ == '__main__':
+    main()
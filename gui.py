@@ -6,14 +6,25 @@ import hjson
 import random
 import os
 import shutil
-import hashlib
 import sys
+import logging
+import queue
+import threading
 sys.path.append('src')
 from Utilities import get_filename
-from ROM import BD, BS
+from ROM import BD, BS, patchPath
+from Output import OUTPUTS
+from Cache import CACHE
+from Verify import checkROM, ROM_CHECKS
+from Progress import PROGRESS
 
 MAIN_TITLE = f"Bravely Randomize v{RELEASE}"
 
+# Patches already made are kept here and reused for the same settings
+CACHE_PATH = 'patch_cache'
+CACHE_SIZE = 512 << 20
+# Digests of romfs files already checked
+
 # Source: https://www.daniweb.com/programming/software-development/code/484591/a-tooltip-class-for-tkinter
 class CreateToolTip(object):
     '''
@@ -53,6 +64,9 @@ class GuiApplication:
         self.master = tk.Tk()
         self.master.geometry('675x470')
         self.master.title(MAIN_TITLE)
+        self.cache = loadCache(CACHE_PATH, CACHE_SIZE)
+        self.worker = None
+        self.master.protocol('WM_DELETE_WINDOW', self.close)
         self.initialize_gui()
         self.initialize_settings(settings)
         self.master.mainloop()
@@ -158,6 +172,10 @@ class GuiApplication:
         self.canvas = tk.Canvas()
         self.canvas.grid(row=6, column=0, columnspan=20, pady=10)
 
+        # Shown while randomizing
+        self.progressLabel = tk.Label(self.canvas, fg='blue')
+        self.progressBar = ttk.Progressbar(self.canvas, length=400, maximum=100)
+
     def checkPath(self, path):
         # Ensure romfs directory
         dirName = os.path.basename(os.path.normpath(path))
@@ -166,22 +184,7 @@ class GuiApplication:
         return False
 
     def checkROM(self, path):
-        # Check if all files exist
-        for game, digests in self.sha256.items():
-            # Check if all files exists
-            filenames = [os.path.join(path, key) for key in digests]
-            fileChecks = [os.path.isfile(f) for f in filenames]
-            if not all(fileChecks):
-                continue
-            # Check digests
-            for filename, digest in zip(filenames, digests.values()):
-                with open(filename, 'rb') as file:
-                    data = bytearray(file.read())
-                    x = hashlib.sha256(data).hexdigest()
-                    if x != digest:
-                        return False
-            return game            
-        return False
+        return checkROM(path, self.sha256, ROM_CHECKS)
 
     def getRomPath(self, path=None):
         self.clearBottomLabels()
@@ -256,43 +259,138 @@ class GuiApplication:
     def randomSeed(self):
         self.settings['seed'].set(random.randint(0, 1e8))
 
+    # Randomizing runs on a worker thread so the window stays responsive.
+    # Its progress events are queued and shown by pollProgress.
     def randomize(self, settings=None):
         if settings is None:
             settings = { key: value.get() for key, value in self.settings.items() }
         self.clearBottomLabels()
         self.bottomLabel('Randomizing....', 'blue', 0)
-        if randomize(settings):
-            self.clearBottomLabels()
+        self.events = queue.Queue()
+        self.cancel = threading.Event()
+        progress = PROGRESS(self.events.put, self.cancel)
+        self.worker = threading.Thread(target=self.randomizeWorker, args=(settings, progress), daemon=True)
+        self.randomizeBtn.config(text='Cancel', command=self.cancelRandomize)
+        self.progressBar['value'] = 0
+        self.progressLabel.config(text='')
+        self.progressLabel.grid(row=1, columnspan=20)
+        self.progressBar.grid(row=2, columnspan=20, pady=5)
+        self.worker.start()
+        self.master.after(50, self.pollProgress)
+
+    def randomizeWorker(self, settings, progress):
+        try:
+            success = randomize(settings, cache=self.cache, progress=progress)
+        except (Exception, SystemExit):
+            success = False
+        self.events.put({'phase': 'done', 'success': success})
+
+    def pollProgress(self):
+        phases = {'load': 'Loading', 'step': 'Running', 'dump': 'Writing', 'printLogs': 'Writing logs', 'finished': 'Done'}
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event['phase'] == 'done':
+                self.randomizeDone(event['success'])
+                return
+            self.progressBar['value'] = event['percent']
+            text = phases.get(event['phase'], event['phase'])
+            if event['archive']:
+                text += f" {event['archive']}"
+            self.progressLabel.config(text=text)
+        self.master.after(50, self.pollProgress)
+
+    def cancelRandomize(self):
+        self.cancel.set()
+        self.randomizeBtn.config(state=tk.DISABLED)
+
+    def randomizeDone(self, success):
+        self.worker = None
+        self.progressLabel.grid_remove()
+        self.progressBar.grid_remove()
+        self.randomizeBtn.config(text='Randomize', command=self.randomize, state=tk.NORMAL)
+        self.clearBottomLabels()
+        if success:
             self.bottomLabel('Randomizing...done! Good luck!', 'blue', 0)
+        elif self.cancel.is_set():
+            self.bottomLabel('Randomizing cancelled.', 'blue', 0)
         else:
-            self.clearBottomLabels()
             self.bottomLabel('Mrgrgrgrgr!', 'red', 0)
             self.bottomLabel('Randomizing failed.', 'red', 1)
 
+    # A running job is cancelled first, so it cleans up its output.
+    # The window is hidden right away and destroyed once the job ends.
+    def close(self):
+        if self.worker:
+            self.cancel.set()
+            self.master.withdraw()
+            self.closeWhenDone(self.worker)
+        else:
+            self.master.destroy()
+
+    def closeWhenDone(self, worker):
+        if worker.is_alive():
+            self.master.after(50, self.closeWhenDone, worker)
+        else:
+            self.master.destroy()
+
+
+def loadDigests():
+    with open(get_filename('./json/sha.json'), 'r') as file:
+        return hjson.loads(file.read())
+
 
-def randomize(settings):
+def loadCache(path, maxSize=CACHE_SIZE):
+    return CACHE(path, loadDigests(), RELEASE, maxSize, ROM_CHECKS)
+
+
+# Copy a cached patch to the output, if there is one
+def restore(settings, cache, key):
+    patch = cache.lookup(key)
+    if not patch:
+        return False
+    output = OUTPUTS[settings.get('output', 'directory')](patchPath(settings))
+    try:
+        output.restore(patch)
+        output.close()
+    except Exception:
+        output.remove()
+        return False
+    return True
+
+
+def randomize(settings, vanilla=None, timings=False, cache=None, progress=None):
+
+    key = cache.key(settings) if cache else None
+    if key and restore(settings, cache, key):
+        return True
 
     if settings['game'] == 'BD':
-        rom = BD(settings)
+        rom = BD(settings, vanilla, progress=progress)
     elif settings['game'] == 'BS':
-        rom = BS(settings)
+        rom = BS(settings, vanilla, progress=progress)
     else:
         sys.exit(f"No option exists for game setting {settings['game']}!")
 
     try:
-        rom.randomize()
-        rom.qualityOfLife()
-        rom.dumpFiles()
-        rom.printLogs()
-        rom.printSettings()
+        rom.run(timings)
     except:
         rom.fail() # REMOVE PATCH DIRECTORY
         return False
 
+    if key:
+        try:
+            cache.store(key, rom.output)
+        except OSError as e:
+            print(f"Could not cache the patch: {e}")
+
     return True
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
     if len(sys.argv) > 2:
         print('Usage: python gui.py <settings.json>')
     elif len(sys.argv) == 2:
@@ -1,14 +1,54 @@
 import sys
+import logging
+import argparse
+import cProfile
+import pstats
+import threading
 import hjson
-from gui import randomize
+from gui import randomize, loadCache, loadDigests, ROM_CHECKS
+from Verify import checkROM
 
-def main(settings):
-    if not randomize(settings):
+def main(settings, timings=False, cache=None):
+    if not randomize(settings, timings=timings, cache=cache):
         print('Failed!')
 
+# cProfile only sees the thread it runs in, so every thread started
+# during the run (loading, steps, dumps) gets a profiler of its own.
+# Their stats are merged into one file.
+def profile(fileName, *args):
+    profiles = [cProfile.Profile()]
+
+    def startThread(frame, event, arg):
+        threadProfile = cProfile.Profile()
+        profiles.append(threadProfile)
+        threadProfile.enable()
+
+    threading.setprofile(startThread)
+    try:
+        profiles[0].runcall(main, *args)
+    finally:
+        threading.setprofile(None)
+    stats = pstats.Stats(profiles[0])
+    for threadProfile in profiles[1:]:
+        stats.add(threadProfile)
+    stats.dump_stats(fileName)
+
 if __name__=='__main__':
-    if len(sys.argv) != 2:
-        sys.exit('Usage: python main.py settings.json')
-    with open(sys.argv[1], 'r') as file:
+    parser = argparse.ArgumentParser(usage='python main.py settings.json [--timings] [--profile] [--cache DIR]')
+    parser.add_argument('settings')
+    parser.add_argument('--timings', action='store_true', help='write patch_<game>_<seed>.timings.json')
+    parser.add_argument('--profile', action='store_true', help='write cProfile stats to patch_<game>_<seed>.prof')
+    parser.add_argument('--cache', help='reuse patches already made with the same settings, kept in this folder')
+    parser.add_argument('--cache-size', type=int, default=512, help='cache size in MB (default: 512)')
+    parser.add_argument('--skip-check', action='store_true', help='use the romfs without checking it is unmodified')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    cache = loadCache(args.cache, args.cache_size << 20) if args.cache else None
+    with open(args.settings, 'r') as file:
         settings = hjson.load(file)
-    main(settings)
+    if not args.skip_check and checkROM(settings['rom'], loadDigests(), ROM_CHECKS) != settings['game']:
+        sys.exit(f"{settings['rom']} must hold unmodified files of the North American release of {settings['game']}.")
+    if args.profile:
+        profile(f"patch_{settings['game']}_{settings['seed']}.prof", settings, args.timings, cache)
+    else:
+        main(settings, args.timings, cache)
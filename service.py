@@ -0,0 +1,230 @@
+import sys
+import os
+import io
+import json
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import hjson
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from release import RELEASE
+from ROM import GAMES, VANILLA, COMPRESSION, patchPath
+from Output import ZIP
+from Cache import CACHE
+from Verify import ROM_CHECKS
+
+SHA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'json', 'sha.json')
+
+# Parsed vanilla archives of each game, kept for the life of the service.
+# Loaded before the pool forks, so workers share them.
+VANILLAS = {}
+
+def loadVanillas(roms):
+    for game, path in roms.items():
+        if game not in VANILLAS:
+            vanilla = VANILLA(path)
+            vanilla.loadAll(GAMES[game].ARCHIVES.values())
+            VANILLAS[game] = vanilla
+
+# Runs in a worker process; returns the patch as a zip
+def worker(settings, cache=None, key=None):
+    buffer = io.BytesIO()
+    rom = GAMES[settings['game']](settings, VANILLAS[settings['game']], ZIP(patchPath(settings), buffer))
+    rom.run()
+    if key:
+        try:
+            cache.store(key, rom.output)
+        except OSError:
+            pass # Served anyway, just not cached
+    return buffer.getvalue()
+
+# Cache key of these settings and their patch from the cache. The key
+# is None if the romfs can't be hashed, and the patch None if it isn't
+# cached.
+def cached(cache, settings):
+    key = cache.key(settings)
+    patch = cache.lookup(key) if key else None
+    if patch:
+        with open(patch, 'rb') as file:
+            return key, file.read()
+    return key, None
+
+
+class HTTPERROR(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class SERVICE:
+    reasons = {
+        200: 'OK',
+        400: 'Bad Request',
+        404: 'Not Found',
+        405: 'Method Not Allowed',
+        413: 'Payload Too Large',
+        500: 'Internal Server Error',
+        503: 'Service Unavailable',
+    }
+    maxBody = 1 << 20
+
+    def __init__(self, roms, workers=None, queue=16, cache=None):
+        self.roms = roms
+        self.cache = cache
+        self.hits = 0
+        loadVanillas(self.roms)
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+        else:
+            context = multiprocessing.get_context()
+        self.pool = ProcessPoolExecutor(workers, mp_context=context, initializer=loadVanillas, initargs=(roms,))
+        # Workers start on the first job. Fork them now, while this is
+        # the only thread, rather than next to the event loop's threads.
+        self.pool.submit(int).result()
+        self.workers = self.pool._max_workers
+        self.capacity = self.workers + queue
+        self.pending = 0
+
+    # Cached patches are served right away. Other jobs beyond the
+    # workers and the queue are turned away.
+    async def randomize(self, settings):
+        if not isinstance(settings, dict) or settings.get('game') not in self.roms:
+            raise HTTPERROR(400, f"game must be one of {', '.join(self.roms)}")
+        if 'seed' not in settings:
+            raise HTTPERROR(400, 'seed is required')
+        settings = {**settings, 'rom': self.roms[settings['game']], 'output': 'zip'}
+        missing = [key for key in GAMES[settings['game']].SETTINGS if key not in settings]
+        if missing:
+            raise HTTPERROR(400, f"missing settings: {', '.join(missing)}")
+        if settings.get('compression', 'default') not in list(COMPRESSION):
+            raise HTTPERROR(400, f"compression must be one of {', '.join(COMPRESSION)}")
+        loop = asyncio.get_running_loop()
+        key = None
+        if self.cache:
+            key, data = await loop.run_in_executor(None, cached, self.cache, settings)
+            if data is not None:
+                self.hits += 1
+                return data
+        if self.pending >= self.capacity:
+            raise HTTPERROR(503, 'Queue is full, try again later')
+        self.pending += 1
+        try:
+            return await loop.run_in_executor(self.pool, worker, settings, self.cache, key)
+        except Exception as e:
+            raise HTTPERROR(500, f"{type(e).__name__}: {e}")
+        finally:
+            self.pending -= 1
+
+    def status(self):
+        return {
+            'games': list(self.roms),
+            'workers': self.workers,
+            'pending': self.pending,
+            'capacity': self.capacity,
+            'cacheHits': self.hits,
+        }
+
+    async def route(self, method, target, body):
+        if target == '/status':
+            if method != 'GET':
+                raise HTTPERROR(405, 'Use GET')
+            return 'application/json', json.dumps(self.status()).encode('utf-8')
+        if target == '/randomize':
+            if method != 'POST':
+                raise HTTPERROR(405, 'Use POST with the settings as JSON')
+            try:
+                settings = json.loads(body)
+            except ValueError as e:
+                raise HTTPERROR(400, f"Invalid JSON: {e}")
+            return 'application/zip', await self.randomize(settings)
+        raise HTTPERROR(404, f"No route {target}")
+
+    async def readRequest(self, reader):
+        requestLine = await reader.readline()
+        method, target, _ = requestLine.decode('latin-1').split(' ', 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+        size = int(headers.get('content-length', 0))
+        if size > self.maxBody:
+            raise HTTPERROR(413, 'Settings are too large')
+        body = await reader.readexactly(size)
+        return method, target, body
+
+    async def handle(self, reader, writer):
+        try:
+            try:
+                method, target, body = await self.readRequest(reader)
+                status = 200
+                contentType, data = await self.route(method, target, body)
+            except HTTPERROR as e:
+                status = e.status
+                contentType, data = 'text/plain', f"{e}\n".encode('utf-8')
+            except (ValueError, asyncio.IncompleteReadError):
+                status = 400
+                contentType, data = 'text/plain', b'Malformed request\n'
+            header = [
+                f"HTTP/1.1 {status} {self.reasons[status]}",
+                f"Content-Type: {contentType}",
+                f"Content-Length: {len(data)}",
+                'Connection: close',
+            ]
+            if status == 503:
+                header.append('Retry-After: 1')
+            writer.write(('\r\n'.join(header) + '\r\n\r\n').encode('latin-1'))
+            writer.write(data)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8000, socket=None):
+        if socket:
+            server = await asyncio.start_unix_server(self.handle, socket)
+            print(f"Serving on {socket}")
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"Serving on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve randomized patches over HTTP.')
+    parser.add_argument('--bd', help='romfs folder of Bravely Default')
+    parser.add_argument('--bs', help='romfs folder of Bravely Second')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--socket', help='listen on a Unix socket instead')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--queue', type=int, default=16, help='requests waiting for a worker before refusing more')
+    parser.add_argument('--cache', help='keep patches in this folder and serve repeat requests from it')
+    parser.add_argument('--cache-size', type=int, default=512, help='cache size in MB (default: 512)')
+    args = parser.parse_args()
+    roms = {game: path for game, path in [('BD', args.bd), ('BS', args.bs)] if path}
+    if not roms:
+        parser.error('give the romfs of at least one game (--bd, --bs)')
+
+    cache = None
+    if args.cache:
+        with open(SHA, 'r') as file:
+            cache = CACHE(args.cache, hjson.load(file), RELEASE, args.cache_size << 20, ROM_CHECKS)
+    service = SERVICE(roms, args.workers, args.queue, cache)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+if __name__ == '__main__':
+    main()
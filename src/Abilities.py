@@ -1,4 +1,4 @@
-import random
+from Schemas import getSchema
 
 class ABILITIES:
     def __init__(self, abilityFiles):
@@ -6,11 +6,27 @@ class ABILITIES:
         self.comAbilFile = self.crowdFiles['CommandAbility.btb']
         self.supAbilFile = self.crowdFiles['SupportAbility.btb']
         self.jobComFile = self.crowdFiles['JobCommand.btb']
-        self.jobComIds = self.jobComFile.readCol(0)
-        self.comAbilIds = self.comAbilFile.readCol(0)
-        self.supAbilIds = self.supAbilFile.readCol(0)
+        self.comAbilSchema = getSchema('CommandAbility.btb', self.game)
+        self.supAbilSchema = getSchema('SupportAbility.btb', self.game)
+        self.jobComSchema = getSchema('JobCommand.btb', self.game)
+        self.costCol = self.supAbilSchema.col('cost')
+        self.jobComIds = self.jobComFile.readCol(self.jobComSchema.col('id'))
+        self.comAbilIds = self.comAbilFile.readCol(self.comAbilSchema.col('id'))
+        self.supAbilIds = self.supAbilFile.readCol(self.supAbilSchema.col('id'))
         self.supAbilIdToRow = {i:r for r,i in enumerate(self.supAbilIds)}
 
+        self.jobComNames = self.jobComFile.readTextStringAll(self.jobComSchema.col('name'))
+        self.jobComIdToName = {i:n for i,n in zip(self.jobComIds, self.jobComNames)}
+
+        self.comAbilNames = self.comAbilFile.readTextStringAll(self.comAbilSchema.col('name'))
+        self.comAbilIdToName = {}
+        for i, n in zip(self.comAbilIds, self.comAbilNames):
+            if not i in self.comAbilIdToName: # Skip repeats!
+                self.comAbilIdToName[i] = n
+
+        self.supAbilNames = self.supAbilFile.readTextStringAll(self.supAbilSchema.col('name'))
+        self.supAbilIdToName = {i:n for i,n in zip(self.supAbilIds, self.supAbilNames)}
+
     def getJobName(self, fileName):
         return self.fileToMage[fileName]
 
@@ -22,30 +38,19 @@ class ABILITIES:
         row = self.supAbilIds.index(id)
         return self.supAbilFile.readValue(row, self.costCol)
 
-    def shuffleSupportCosts(self):
+    def shuffleSupportCosts(self, rng):
         costs = self.supAbilFile.readCol(self.costCol)
-        random.shuffle(costs)
+        rng.shuffle(costs)
         self.supAbilFile.patchCol(costs, self.costCol)
         
 
         
 
 class ABILITIES_BD(ABILITIES):
+    game = 'BD'
+
     def __init__(self, abilityFiles):
         super().__init__(abilityFiles)
-        self.costCol = 5
-
-        self.jobComNames = self.jobComFile.readTextStringAll(1)
-        self.jobComIdToName = {i:n for i,n in zip(self.jobComIds, self.jobComNames)}
-
-        self.comAbilNames = self.comAbilFile.readTextStringAll(4)
-        self.comAbilIdToName = {}
-        for i, n in zip(self.comAbilIds, self.comAbilNames):
-            if not i in self.comAbilIdToName: # Skip repeats!
-                self.comAbilIdToName[i] = n
-
-        self.supAbilNames = self.supAbilFile.readTextStringAll(3)
-        self.supAbilIdToName = {i:n for i,n in zip(self.supAbilIds, self.supAbilNames)}
 
         self.fileToMage = {
             'AbilityWMG.btb': 'White Mage',
@@ -75,21 +80,10 @@ class ABILITIES_BD(ABILITIES):
 
 
 class ABILITIES_BS(ABILITIES):
+    game = 'BS'
+
     def __init__(self, abilityFiles):
         super().__init__(abilityFiles)
-        self.costCol = 6
-                
-        self.jobComNames = self.jobComFile.readTextStringAll(2)
-        self.jobComIdToName = {i:n for i,n in zip(self.jobComIds, self.jobComNames)}
-
-        self.comAbilNames = self.comAbilFile.readTextStringAll(4)
-        self.comAbilIdToName = {}
-        for i, n in zip(self.comAbilIds, self.comAbilNames):
-            if not i in self.comAbilIdToName: # Skip repeats!
-                self.comAbilIdToName[i] = n
-
-        self.supAbilNames = self.supAbilFile.readTextStringAll(4)
-        self.supAbilIdToName = {i:n for i,n in zip(self.supAbilIds, self.supAbilNames)}
 
         self.fileToMage = {
             'AbilityBMG.btb': 'Black Mage',
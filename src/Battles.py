@@ -1,35 +1,34 @@
+import numpy as np
+from Schemas import getSchema
 
 class BATTLES:
+    game = 'BS'
+
     def __init__(self, dataFiles):
         self.dataFile = dataFiles.crowdFiles['MonsterData.btb']
+        self.schema = getSchema('MonsterData.btb', self.game)
 
-    def scaleArray(self, col, scale, maxValue):
-        array = self.dataFile.readCol(col)
-        array = [min(a*scale, maxValue) for a in array]
+    def scaleArray(self, key, scale, maxValue):
+        col = self.schema.col(key)
+        array = self.dataFile.readColArray(col).astype(np.int64)
+        array = np.minimum(array*scale, maxValue)
         self.dataFile.patchCol(array, col)
+
+    # Not every game has a second column of each
+    def scaleArrays(self, keys, scale, maxValue):
+        for key in keys:
+            if key in self.schema:
+                self.scaleArray(key, scale, maxValue)
         
     def scaleEXP(self, scale):
-        self.scaleArray(111, scale, 999999)
-        self.scaleArray(112, scale, 999999)
+        self.scaleArrays(['exp', 'exp2'], scale, 999999)
 
     def scaleJP(self, scale):
-        self.scaleArray(113, scale, 999)
-        self.scaleArray(114, scale, 999)
+        self.scaleArrays(['jp', 'jp2'], scale, 999)
 
     def scalePG(self, scale):
-        self.scaleArray(115, scale, 999999)
-        self.scaleArray(116, scale, 999999)
+        self.scaleArrays(['pg', 'pg2'], scale, 999999)
 
 
 class BATTLES_BD(BATTLES):
-    def __init__(self, dataFiles):
-        super().__init__(dataFiles)
-        
-    def scaleEXP(self, scale):
-        self.scaleArray(91, scale, 999999)
-
-    def scaleJP(self, scale):
-        self.scaleArray(92, scale, 999)
-
-    def scalePG(self, scale):
-        self.scaleArray(93, scale, 999999)
+    game = 'BD'
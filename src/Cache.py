@@ -0,0 +1,106 @@
+import os
+import json
+import hashlib
+import tempfile
+from Utilities import hashFile
+from Verify import romDigests
+from ROM import GAMES
+
+# Finished patches, keyed by everything that decides their contents:
+# the romfs files (by the digests they actually have, remembered in
+# the checks sidecar file), the settings the game uses, the seed and
+# the release. Each entry is the saved patch and a record of its
+# digest, checked before the entry is used. Once the cache grows past
+# maxSize bytes, the least recently used entries are removed.
+class CACHE:
+    def __init__(self, path, digests, release, maxSize=1<<30, checks=None):
+        self.path = path
+        self.digests = digests # game -> {file: sha256}, the files to hash
+        self.release = release
+        self.checks = checks
+        self.maxSize = maxSize
+        os.makedirs(self.path, exist_ok=True)
+
+    # The romfs path doesn't matter, only which files it holds, and
+    # settings the game doesn't use don't either. None if some of the
+    # files are missing, and then nothing gets cached.
+    def key(self, settings):
+        digests = romDigests(settings['rom'], settings['game'], self.digests, self.checks)
+        if digests is None:
+            return None
+        game = GAMES[settings['game']]
+        used = [k for k in game.SETTINGS + list(game.OPTIONS) if k != 'rom']
+        settings = {**game.OPTIONS, **{k: v for k, v in settings.items() if k in used}}
+        key = {
+            'digests': digests,
+            'release': self.release,
+            'settings': settings,
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def entry(self, key):
+        base = os.path.join(self.path, key)
+        return base + '.patch', base + '.json'
+
+    def discard(self, key):
+        for fileName in self.entry(key):
+            try:
+                os.remove(fileName)
+            except FileNotFoundError:
+                pass # Removed by another run
+
+    # Patch stored for key, or None. Corrupt entries are dropped.
+    def lookup(self, key):
+        patch, record = self.entry(key)
+        try:
+            with open(record, 'r') as file:
+                info = json.load(file)
+            if os.path.getsize(patch) != info['size'] or hashFile(patch) != info['sha256']:
+                raise ValueError('Digest mismatch')
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError):
+            self.discard(key)
+            return None
+        os.utime(record) # Most recently used
+        return patch
+
+    # Save a finished output under key, replacing entries atomically
+    # so concurrent runs never see half a patch
+    def store(self, key, output):
+        patch, record = self.entry(key)
+        fd, temp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                output.save(file)
+            info = {'size': os.path.getsize(temp), 'sha256': hashFile(temp)}
+            os.replace(temp, patch)
+            fd, temp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            with os.fdopen(fd, 'w') as file:
+                json.dump(info, file)
+            os.replace(temp, record)
+        finally:
+            if os.path.isfile(temp):
+                os.remove(temp)
+        self.evict(keep=key)
+
+    # Drop least recently used entries until the cache fits
+    def evict(self, keep=None):
+        entries = []
+        for fileName in os.listdir(self.path):
+            key, extension = os.path.splitext(fileName)
+            if extension != '.json' or key == keep:
+                continue
+            patch, record = self.entry(key)
+            try:
+                entries.append((os.path.getmtime(record), os.path.getsize(patch), key))
+            except OSError:
+                continue # Removed by another run
+        total = sum(size for _, size, _ in entries)
+        if keep:
+            total += os.path.getsize(self.entry(keep)[0])
+        for _, size, key in sorted(entries):
+            if total <= self.maxSize:
+                break
+            self.discard(key)
+            total -= size
@@ -1,5 +1,44 @@
 import os
+import mmap
 import zlib
+import threading
+from copy import copy
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Map a file read-only. Slicing a memoryview of it doesn't copy anything.
+def mapFile(fileName):
+    with open(fileName, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+# I/O counters of an archive, safe to update from worker threads
+class STATS(dict):
+    def __init__(self):
+        super().__init__(bytesRead=0, bytesWritten=0, inflated=0, deflatedIn=0, deflatedOut=0)
+        self.lock = threading.Lock()
+
+    def count(self, **counts):
+        with self.lock:
+            for key, value in counts.items():
+                self[key] += value
+
+    # Compressed size over raw size of everything deflated
+    def ratio(self):
+        if self['deflatedIn'] == 0:
+            return None
+        return self['deflatedOut'] / self['deflatedIn']
+
+
+# Open a file for writing, creating its directory if necessary
+def createFile(fileName):
+    base = os.path.dirname(fileName)
+    if base:
+        os.makedirs(base, exist_ok=True)
+    return open(fileName, 'wb')
+
 
 class FILE:
     def __init__(self, data):
@@ -20,12 +59,16 @@ class FILE:
 
     def readString(self, size=1):
         # Find end of string
-        addrStart = self.address
-        while self.address < len(self.data) and self.data[self.address]:
-            self.address += size
+        terminator = bytes(size)
+        end = self.data.find(terminator, self.address)
+        while end >= 0 and (end - self.address) % size:
+            end = self.data.find(terminator, end+1)
+        if end < 0:
+            end = len(self.data)
         # Decode string
-        string = self.data[addrStart:self.address].decode(self.encoding[size])
+        string = bytes(self.data[self.address:end]).decode(self.encoding[size])
         # Increment address up to the next string
+        self.address = end
         while self.address < len(self.data):
             if self.data[self.address] > 0:
                 break
@@ -33,10 +76,53 @@ class FILE:
         return string
 
 
+# Text block decoded in one go, with strings looked up by byte offset
+class TEXT:
+    def __init__(self, data):
+        data = bytes(data)
+        self.data = data
+        self.text = data[:len(data) & ~1].decode('utf-16-le', errors='surrogatepass')
+        self.strings = None
+
+    def buildIndex(self):
+        self.strings = {}
+        offset = 0
+        for string in self.text.split('\x00'):
+            self.strings[offset] = string
+            offset += 2 * (len(string) + 1)
+
+    def getString(self, offset):
+        if self.strings is None:
+            self.buildIndex()
+        if offset not in self.strings:
+            # Offset into the middle of a string, or misaligned
+            if offset % 2:
+                text = self.data[offset:].decode('utf-16-le', errors='surrogatepass')
+                start = 0
+            else:
+                text, start = self.text, offset // 2
+            end = text.find('\x00', start)
+            self.strings[offset] = text[start:end if end >= 0 else None]
+        return self.strings[offset]
+
+    # All strings, in the order they are stored
+    def getStrings(self):
+        return self.text.split('\x00')
+
+
 # FILE object + access to reading and patching as if a spreadsheet
 class DATAFILE(FILE):
+    lock = threading.Lock()
+
     def __init__(self, data):
         super().__init__(data)
+        self.readHeader()
+        # Set by any patch; clean files are dumped as is
+        self.dirty = False
+        # Set once the archive is being dumped; later patches would be lost
+        self.sealed = False
+
+    def readHeader(self):
         self.address = 8
         # Data
         self.base = self.read()
@@ -50,12 +136,42 @@ class DATAFILE(FILE):
         # Entries
         self.stride = self.read() # bytes / entry
         self.count = self.read()  # number of entries
+        # Decoded on demand
+        self.text = None
+
+    # Replace the whole file, e.g. with a table from buildTable
+    def setData(self, data):
+        assert not self.sealed, 'Table patched after its archive was dumped!'
+        self.data = data
+        self.readHeader()
+        self.dirty = True
+
+    # Copy that shares the (immutable) data until either one is patched
+    def clone(self):
+        data = bytes(self.data) if isinstance(self.data, bytearray) else self.data
+        dataFile = DATAFILE(data)
+        dataFile.dirty = self.dirty
+        dataFile.text = self.text
+        return dataFile
+
+    # Data may start as a read-only view into a mapped file.
+    # Copy it the first time it gets patched.
+    def materialize(self):
+        assert not self.sealed, 'Table patched after its archive was dumped!'
+        if not isinstance(self.data, bytearray):
+            with self.lock:
+                if not isinstance(self.data, bytearray):
+                    self.data = bytearray(self.data)
+
+    def getText(self):
+        if self.text is None:
+            self.text = TEXT(self.data[self.textBase:self.textBase+self.textSize])
+        return self.text
 
     def getTextData(self):
-        data = self.data[self.textBase:self.textBase+self.textSize]
-        data = bytes(data[::2]).split(b'\x00')
+        data = self.getText().getStrings()
         y = len(data) // self.count
-        x = [[str(d)[2:] for d in data[i::y]] for i in range(y)]
+        x = [data[i::y] for i in range(y)]
         return x
 
     def getComData(self):
@@ -66,158 +182,307 @@ class DATAFILE(FILE):
         except:
             return []
         
-    # Data tables can only be updated under certain circumstances.
-    # Assumes all columns have the same byte size (currently 4)
-    # Assumes no text.
-    # Now, only use for Shops and Ability tables
+    # Rebuild the table from columns, keeping command strings and text
     def updateData(self, *cols):
-        # Ensure no text
-        assert self.comSize == 0
-        assert self.textSize == 0
-        # Update data
-        data = bytearray([])
-        numEntries = 0
-        for row in zip(*cols):
-            for ri in row:
-                data += ri.to_bytes(4, byteorder='little', signed=True)
-            numEntries += 1
-        lenData = len(data).to_bytes(4, byteorder='little', signed=True)
-        fileSize = int(len(data)+0x30).to_bytes(4, byteorder='little', signed=True)
-        header = bytearray(b'BTBF')
-        header += fileSize
-        header += int(0x30).to_bytes(4, byteorder='little', signed=True)
-        header += lenData
-        header += fileSize + bytearray([0]*4)
-        header += fileSize + bytearray([0]*4)
-        header += int(8).to_bytes(4, byteorder='little', signed=True)
-        header += numEntries.to_bytes(4, byteorder='little', signed=True)
-        header += bytearray([0]*8)
-        self.data = header + data
+        comData = self.data[self.comBase:self.comBase+self.comSize]
+        textData = self.data[self.textBase:self.textBase+self.textSize]
+        self.setData(buildTable(cols, comData=comData, textData=textData))
 
-    def readCol(self, col, row=0, numRows=None):
+    # Zero-copy view of the table as int32 (count x stride/4), stepping
+    # stride bytes per row whatever the stride.
+    # Read only unless requested, so writes go through patch* and mark the file dirty.
+    def getArray(self, writeable=False):
+        numCols = self.stride // 4
+        array = np.ndarray((self.count, numCols), dtype='<i4', buffer=self.data,
+                           offset=self.base, strides=(self.stride, 4))
+        if not writeable:
+            array.flags.writeable = False
+        return array
+
+    def readColArray(self, col, row=0, numRows=None):
         if not numRows:
             numRows = self.count
-        numRows = min(numRows, self.count - row)
-        data = []
-        for r in range(row, row+numRows):
-            data.append( self.readValue(r, col) )
-        return data
+        numRows = max(min(numRows, self.count - row), 0)
+        return self.getArray()[row:row+numRows, col]
+
+    def readCol(self, col, row=0, numRows=None):
+        return self.readColArray(col, row, numRows).tolist()
 
     def readRow(self, row, col=0, numCol=None):
         if not numCol:
             maxCol = int(self.stride / 4)
             numCol = maxCol - col
-        data = []
-        for c in range(col, col+numCol):
-            data.append( self.readValue(row, c) )
-        return data
+        return self.getArray()[row, col:col+numCol].tolist()
     
     def readValue(self, row, col, size=4):
         address = self.base + row*self.stride + col*size
         return int.from_bytes(self.data[address:address+size], byteorder='little', signed=True)
 
     def patchCol(self, lst, col, row=0):
-        for i, value in enumerate(lst):
-            self.patchValue(value, row+i, col)
+        self.materialize()
+        array = self.getArray(writeable=True)
+        array[row:row+len(lst), col] = lst
+        self.dirty = True
 
     def patchRow(self, lst, row, col=0):
-        for i, value in enumerate(lst):
-            self.patchValue(value, row, col+i)
+        self.materialize()
+        array = self.getArray(writeable=True)
+        array[row, col:col+len(lst)] = lst
+        self.dirty = True
 
     def patchValue(self, value, row, col, size=4):
+        self.materialize()
         address = self.base + row*self.stride + col*size
         self.data[address:address+size] = value.to_bytes(size, byteorder='little', signed=True)
+        self.dirty = True
     
     def readComString(self, row, col):
         offset = self.readValue(row, col)
-        self.address = self.comBase + offset
-        return self.readString(size=1)
+        comFile = FILE(bytes(self.data[self.comBase:self.comBase+self.comSize]))
+        comFile.address = offset
+        return comFile.readString(size=1)
 
     def readTextString(self, row, col):
         offset = self.readValue(row, col)
-        self.address = self.textBase + offset
-        return self.readString(size=2)
+        return self.getText().getString(offset)
 
     def readTextStringAll(self, col):
-        strings = []
-        for row in range(self.count):
-            string = self.readTextString(row, col)
-            strings.append(string)
-        return strings
+        text = self.getText()
+        return [text.getString(offset) for offset in self.readCol(col)]
     
     # TODO
     def patchString(self):
         pass
 
-    # TODO -- probably won't need to patch commands, only text
-    def patchTextString(self, string, row, col):
-        # Check string first to ensure it fits!
-        check = self.readTextString(row, col)
-        assert len(check) >= len(string), 'String is too long!'
-        sizeDiff = 2 * (len(check) - len(string))
-        # Encode string
-        newString = string.encode('utf-16')[2:]
-        newString += bytearray([0]*sizeDiff)
-        # Patch
-        offset = self.readValue(row, col)
-        address = self.textBase + offset
-        self.data[address:address+len(newString)] = newString
-        
+    def patchTextString(self, string, row, col, textCols=None):
+        self.patchTextStrings([(string, row, col)], textCols)
+
+    # Patch a batch of strings, rebuilding the text block once.
+    # Strings that fit are overwritten in place, unless another cell of
+    # the text columns (by default, the edited ones) points into them
+    # too (pooled strings); the others are appended.
+    def patchTextStrings(self, edits, textCols=None):
+        if textCols is None:
+            textCols = sorted({col for _, _, col in edits})
+        self.materialize()
+        textSize = self.textSize
+        pool = bytearray(self.data[self.textBase:self.textBase+textSize])
+        appended = {}
+        for string, row, col in edits:
+            newString = string.encode('utf-16-le') + bytes(2)
+            offset = self.readValue(row, col)
+            if 0 <= offset < textSize:
+                oldString = self.readTextString(row, col).encode('utf-16-le') + bytes(2)
+                array = self.getArray()[:, textCols]
+                shared = np.count_nonzero((array >= offset) & (array < offset + len(oldString))) > 1
+                if len(newString) <= len(oldString) and not shared:
+                    pool[offset:offset+len(oldString)] = newString.ljust(len(oldString), b'\x00')
+                    continue
+            if newString not in appended:
+                pool += bytes(len(pool) % 2)
+                appended[newString] = len(pool)
+                pool += newString
+            self.patchValue(appended[newString], row, col)
+        if appended:
+            pool += bytes(-len(pool) % 4)
+        self.resizeText(pool)
+
+    # Replace the text block, moving anything stored after it
+    def resizeText(self, pool):
+        start = self.textBase
+        end = self.textBase + self.textSize
+        diff = len(pool) - self.textSize
+        if diff:
+            self.address = 4
+            fileSize = self.read()
+            if fileSize >= end:
+                self.data[4:8] = (fileSize + diff).to_bytes(4, byteorder='little', signed=True)
+            if self.base >= end:
+                self.base += diff
+                self.data[8:12] = self.base.to_bytes(4, byteorder='little', signed=True)
+            if self.comBase >= end:
+                self.comBase += diff
+                self.data[16:20] = self.comBase.to_bytes(4, byteorder='little', signed=True)
+            self.textSize = len(pool)
+            self.data[28:32] = self.textSize.to_bytes(4, byteorder='little', signed=True)
+        self.data = self.data[:start] + pool + self.data[end:]
+        self.dirty = True
+        self.text = None
+
+
+
+# Build a BTBF file from columns of 4 byte values.
+# Rows are padded with zeros up to stride; blocks are aligned to 4 bytes.
+def buildTable(cols, stride=None, comData=b'', textData=b''):
+    cols = np.array(cols, dtype='<i4').reshape(len(cols), -1)
+    numCols, count = cols.shape
+    if stride is None:
+        stride = 4 * numCols
+    assert stride >= 4 * numCols, 'Stride is too small for the columns!'
+    table = np.zeros((count, stride), dtype=np.uint8)
+    table[:, :4*numCols] = np.ascontiguousarray(cols.T).view(np.uint8)
+    comData = bytes(comData) + bytes(-len(comData) % 4)
+    textData = bytes(textData) + bytes(-len(textData) % 4)
+    base = 0x30
+    size = table.nbytes
+    comBase = base + size
+    textBase = comBase + len(comData)
+    fileSize = textBase + len(textData)
+    header = np.array([
+        fileSize, base, size,
+        comBase, len(comData),
+        textBase, len(textData),
+        stride, count,
+        0, 0,
+    ], dtype='<i4')
+    return b''.join([b'BTBF', header.tobytes(), table.tobytes(), comData, textData])
 
 
 class TABLE:
-    def __init__(self, fileName):
+    def __init__(self, fileName, fileNameOut=None):
         self.fileName = fileName
-        with open(self.fileName, 'rb') as file:
-            self.tableData = bytearray(file.read())
+        self.fileNameOut = fileNameOut if fileNameOut else fileName
+        self.tableData = memoryview(mapFile(self.fileName))
         baseName = os.path.basename(self.fileName)
-        self.crowdFiles = {baseName: DATAFILE(self.tableData)}
+        self.dataFile = DATAFILE(self.tableData)
+        self.crowdFiles = {baseName: self.dataFile}
+        self.stats = STATS()
+        self.stats.count(bytesRead=len(self.tableData))
+
+    def clone(self, fileNameOut=None):
+        table = copy(self)
+        table.fileNameOut = fileNameOut if fileNameOut else self.fileNameOut
+        table.stats = STATS()
+        table.dataFile = self.dataFile.clone()
+        table.crowdFiles = {name: table.dataFile for name in self.crowdFiles}
+        return table
+
+    def isModified(self):
+        return self.dataFile.dirty and self.dataFile.data != self.tableData
+
+    def seal(self):
+        self.dataFile.sealed = True
+
+    # Only write tables that differ from the original.
+    # Output can be anything with a create(fileName) method (see Output.py).
+    def dump(self, output=None):
+        if not self.isModified():
+            return False
+        create = output.create if output else createFile
+        data = self.dataFile.data
+        if self.fileNameOut == self.fileName:
+            # Don't overwrite the file while it's still mapped
+            data = bytes(data)
+        with create(self.fileNameOut) as file:
+            file.write(data)
+        self.stats.count(bytesWritten=len(data))
+        return True
+
+
+
+# Ordered view of the files in a crowd. Files are only extracted
+# (and decompressed) from crowd.fs the first time they are accessed.
+class CROWDFILES(MutableMapping):
+    def __init__(self, crowd, fileNames):
+        self.crowd = crowd
+        self.fileNames = dict.fromkeys(fileNames)
+
+    def __getitem__(self, fileName):
+        if fileName not in self.fileNames:
+            raise KeyError(fileName)
+        return self.crowd.loadFile(fileName)
+
+    def __setitem__(self, fileName, dataFile):
+        dataFile.dirty = True
+        self.fileNames[fileName] = None
+        self.crowd.dataFiles[fileName] = dataFile
+
+    def __delitem__(self, fileName):
+        del self.fileNames[fileName]
+
+    def __iter__(self):
+        return iter(self.fileNames)
 
-    def dump(self):
-        with open(self.fileName, 'wb') as file:
-            file.write(self.tableData)
+    def __len__(self):
+        return len(self.fileNames)
 
+    def __contains__(self, fileName):
+        return fileName in self.fileNames
+
+    def __copy__(self):
+        return CROWDFILES(self.crowd, self.fileNames)
 
 
 class CROWD:
-    def __init__(self, path):
+    def __init__(self, path, pathOut=None, level=zlib.Z_DEFAULT_COMPRESSION, workers=None):
         self.path = path
-        
-        fileName = os.path.join(path, 'index.fs')
-        with open(fileName, 'rb') as file:
-            self.indexData = bytearray(file.read())
-            self.indexFile = FILE(self.indexData)
+        self.pathOut = pathOut if pathOut else path
+        self.level = level
+        self.workers = workers
 
-        fileName = os.path.join(path, 'crowd.fs')
-        with open(fileName, 'rb') as file:
-            self.crowdData = bytearray(file.read())
+        self.indexData = mapFile(os.path.join(path, 'index.fs'))
+        self.indexFile = FILE(self.indexData)
+        self.crowdData = memoryview(mapFile(os.path.join(path, 'crowd.fs')))
+        self.stats = STATS()
+        self.stats.count(bytesRead=len(self.indexData))
+        self.lock = threading.Lock()
+        self.sealed = False
 
-        # Split crowd files
+        # Index crowd files; extract them on demand
+        self.vanilla = None
+        self.entries = {}
         self.isCompressed = {}
-        self.crowdFiles = {}
+        self.dataFiles = {}
         self.separateCrowd()
+        self.crowdFiles = CROWDFILES(self, self.entries)
 
-    def dump(self):
+    # Copy that extracts files from this crowd, sharing their data
+    def clone(self, pathOut=None, level=None):
+        crowd = copy(self)
+        crowd.vanilla = self
+        crowd.pathOut = pathOut if pathOut else self.pathOut
+        if level is not None:
+            crowd.level = level
+        crowd.dataFiles = {}
+        crowd.crowdFiles = CROWDFILES(crowd, self.crowdFiles)
+        crowd.stats = STATS()
+        crowd.lock = threading.Lock()
+        crowd.sealed = False
+        return crowd
+
+    # Only write crowds that differ from the original
+    def dump(self, output=None):
+        if not self.isModified():
+            return False
+        create = output.create if output else createFile
         # Rebuild index and crowd data
-        self.joinCrowd()
+        indexData, crowdFiles = self.joinCrowd()
+        if self.pathOut == self.path:
+            # Don't overwrite files while they're still mapped
+            indexData = bytes(indexData)
+            crowdFiles = list(map(bytes, crowdFiles))
         # Dump index
-        fileOut = os.path.join(self.path, 'index.fs')
-        with open(fileOut, 'wb') as file:
-            file.write(self.indexData)
+        fileOut = os.path.join(self.pathOut, 'index.fs')
+        with create(fileOut) as file:
+            file.write(indexData)
         # Dump crowd
-        fileOut = os.path.join(self.path, 'crowd.fs')
-        with open(fileOut, 'wb') as file:
-            file.write(self.crowdData)
+        fileOut = os.path.join(self.pathOut, 'crowd.fs')
+        with create(fileOut) as file:
+            self.writeCrowd(file, crowdFiles)
+        crowdSize = sum(len(data) + len(self.padding(len(data))) for data in crowdFiles)
+        self.stats.count(bytesWritten=len(indexData) + crowdSize)
+        return True
 
     def separateCrowd(self):
         nextAddr = self.indexFile.read()
         while True:
-            # Extract file from crowd.fs
+            # Locate file in crowd.fs
             base = self.indexFile.read()
             size = self.indexFile.read()
             self.indexFile.address += 4
             fileName = self.indexFile.readString()
-            self.crowdFiles[fileName] = self.extractFile(fileName, base, size)
+            self.entries[fileName] = (base, size)
+            self.isCompressed[fileName] = self.crowdData[base] & 0xFF  == 0x60
             # Last entry?
             if nextAddr == 0:
                 break
@@ -225,51 +490,122 @@ class CROWD:
             self.indexFile.address = nextAddr
             nextAddr = self.indexFile.read()
 
-    def adjustSize(self, data):
-        if len(data) % 4:
-            x = 4 - (len(data) % 4)
-            data += bytearray([0]*x)
-        return data
+    # Files patched back to their original data don't count as dirty
+    def isDirty(self, fileName):
+        if fileName not in self.entries:
+            return True
+        if fileName not in self.dataFiles:
+            return False
+        dataFile = self.dataFiles[fileName]
+        if not dataFile.dirty:
+            return False
+        if self.vanilla:
+            original = self.vanilla.loadFile(fileName).data
+        else:
+            original = self.extractFile(fileName).data
+        return dataFile.data != original
+
+    def isModified(self):
+        if list(self.crowdFiles) != list(self.entries):
+            return True
+        return any(map(self.isDirty, self.crowdFiles))
+
+    def loadFile(self, fileName):
+        if fileName not in self.dataFiles:
+            with self.lock:
+                if fileName not in self.dataFiles:
+                    dataFile = self.extractFile(fileName)
+                    dataFile.sealed = self.sealed
+                    self.dataFiles[fileName] = dataFile
+        return self.dataFiles[fileName]
+
+    # No more patches once dumping starts
+    def seal(self):
+        with self.lock:
+            self.sealed = True
+            for dataFile in self.dataFiles.values():
+                dataFile.sealed = True
+
+    # Extract files in parallel (zlib releases the GIL)
+    def prefetch(self, fileNames=None, workers=None):
+        if fileNames is None:
+            fileNames = self.crowdFiles
+        fileNames = [f for f in fileNames if f not in self.dataFiles]
+        with ThreadPoolExecutor(workers) as executor:
+            dataFiles = executor.map(self.extractFile, fileNames)
+            for fileName, dataFile in zip(fileNames, dataFiles):
+                with self.lock:
+                    self.dataFiles.setdefault(fileName, dataFile)
+
+    # Files in crowd.fs start on 4 byte boundaries
+    def padding(self, size):
+        return bytes(-size % 4)
 
     def joinCrowd(self):
-        self.indexData = bytearray([])
-        self.crowdData = bytearray([])
-        for i, fileName in enumerate(self.crowdFiles):
-            # File for the crowd (compressed if necessary)
-            data = self.getData(fileName)
-            # Entry in the index file
-            crowdStart = len(self.crowdData).to_bytes(4, byteorder='little')
-            crowdSize = len(data).to_bytes(4, byteorder='little')
-            byteFileName = bytearray(map(ord, fileName))
-            crc32 = zlib.crc32(byteFileName).to_bytes(4, byteorder='little')
-            entry = crowdStart + crowdSize + crc32 + byteFileName + bytearray([0])
-            entry = self.adjustSize(entry)
-            if i < len(self.crowdFiles)-1:
-                size = len(self.indexData) + 4 + len(entry)
-                pointer = size.to_bytes(4, byteorder='little')
-            else:
-                pointer = bytearray([0]*4)
-            self.indexData +=  pointer + entry
-            # Append crowd file
-            self.crowdData += data
-            self.crowdData = self.adjustSize(self.crowdData)
-        # Finalize crowdData (actually necessary sometimes!)
-        self.crowdData = self.adjustSize(self.crowdData)
-
-    def extractFile(self, fileName, base, size):
-        self.isCompressed[fileName] = self.crowdData[base] & 0xFF  == 0x60
+        # Files for the crowd (compressed in parallel if necessary)
+        self.compressed = {}
+        fileNames = list(self.crowdFiles)
+        with ThreadPoolExecutor(self.workers) as executor:
+            crowdFiles = list(executor.map(self.getData, fileNames))
+        # Build the index in one pass, laying out the crowd as we go
+        indexData = []
+        indexSize = 0
+        crowdSize = 0
+        for i, (fileName, data) in enumerate(zip(fileNames, crowdFiles)):
+            byteFileName = fileName.encode('ascii')
+            entry = b''.join([
+                crowdSize.to_bytes(4, byteorder='little'),
+                len(data).to_bytes(4, byteorder='little'),
+                zlib.crc32(byteFileName).to_bytes(4, byteorder='little'),
+                byteFileName,
+                b'\x00',
+            ])
+            entry += self.padding(len(entry))
+            indexSize += 4 + len(entry)
+            # Pointer to the next entry in the index file
+            pointer = indexSize if i < len(fileNames)-1 else 0
+            indexData += [pointer.to_bytes(4, byteorder='little'), entry]
+            crowdSize += len(data) + len(self.padding(len(data)))
+        return b''.join(indexData), crowdFiles
+
+    # Stream aligned files to crowd.fs
+    def writeCrowd(self, file, crowdFiles):
+        for data in crowdFiles:
+            file.write(data)
+            file.write(self.padding(len(data)))
+
+    def extractFile(self, fileName):
+        if self.vanilla:
+            return self.vanilla.loadFile(fileName).clone()
+        base, size = self.entries[fileName]
         if self.isCompressed[fileName]:
             data = zlib.decompress(self.crowdData[base+4:base+size], -15)
-            data = bytearray(data)
+            self.stats.count(bytesRead=size, inflated=len(data))
         else:
             data = self.crowdData[base:base+size]
+            self.stats.count(bytesRead=size)
         return DATAFILE(data)
 
     def getData(self, fileName):
+        # Copy unmodified files straight from crowd.fs
+        if not self.isDirty(fileName):
+            base, size = self.entries[fileName]
+            return self.crowdData[base:base+size]
         data = self.crowdFiles[fileName].data
-        if self.isCompressed[fileName]:
-            size = len(data)
-            data = zlib.compress(data)[2:-4]
-            header = int((size << 8) + 0x60).to_bytes(4, byteorder='little')
-            data = header + data
+        if self.isCompressed.get(fileName, False):
+            if isinstance(data, bytes):
+                # Tables built once and shared (e.g. shops) get compressed once
+                key = id(data)
+                if key not in self.compressed:
+                    self.compressed[key] = (data, self.compress(data))
+                return self.compressed[key][1]
+            data = self.compress(data)
         return data
+
+    # Raw deflate stream, with the decompressed size in the header
+    def compress(self, data):
+        header = int((len(data) << 8) + 0x60).to_bytes(4, byteorder='little')
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        compressed = b''.join([header, compressor.compress(data), compressor.flush()])
+        self.stats.count(deflatedIn=len(data), deflatedOut=len(compressed))
+        return compressed
@@ -1,16 +1,15 @@
+from Schemas import getSchema
+
 class ITEMS:
+    game = 'BS'
+
     def __init__(self, dataFile):
         self.dataFile = dataFile.crowdFiles['ItemTable.btb']
-        self.ids = self.dataFile.readCol(0)              ## NB: IDs are unique
-        self.names = self.dataFile.readTextStringAll(4)  ##     names are not! (e.g. Antidote item and spell!)
+        self.schema = getSchema('ItemTable.btb', self.game)
+        self.ids = self.dataFile.readCol(self.schema.col('id'))              ## NB: IDs are unique
+        self.names = self.dataFile.readTextStringAll(self.schema.col('name'))  ##     names are not! (e.g. Antidote item and spell!)
         self.idToName = {i:n for i,n in zip(self.ids, self.names)}
         self.idToRow = {i:r for r,i in enumerate(self.ids)}
-        self.cols = {
-            'order': 3,
-            'icon': 11,
-            'cost': 19,
-            'sell': 20,
-        }
 
     def getName(self, id):
         return self.idToName[id]
@@ -20,17 +19,17 @@ class ITEMS:
 
     def getOrder(self, id):
         row = self.idToRow[id]
-        col = self.cols['order']
+        col = self.schema.col('order')
         return self.dataFile.readValue(row, col)
 
     def getIcon(self, id):
         row = self.idToRow[id]
-        col = self.cols['icon']
+        col = self.schema.col('icon')
         return self.dataFile.readValue(row, col)
 
     def getCost(self, id):
         row = self.idToRow[id]
-        col = self.cols['cost']
+        col = self.schema.col('cost')
         return self.dataFile.readValue(row, col)
     
     def changeCostByName(self, name, value):
@@ -41,28 +40,21 @@ class ITEMS:
 
     def changeCost(self, id, value):
         row = self.idToRow[id]
-        col1 = self.cols['cost']
-        col2 = self.cols['sell']
+        col1 = self.schema.col('cost')
+        col2 = self.schema.col('sell')
         self.dataFile.patchValue(value, row, col1)
         self.dataFile.patchValue(int(value/2), row, col2)
 
     def changeOrder(self, id, value):
         row = self.idToRow[id]
-        col = self.cols['order']
+        col = self.schema.col('order')
         self.dataFile.patchValue(value, row, col)
         
     def changeIcon(self, id, value):
         row = self.idToRow[id]
-        col = self.cols['icon']
+        col = self.schema.col('icon')
         self.dataFile.patchValue(value, row, col)
 
 
 class ITEMS_BD(ITEMS):
-    def __init__(self, dataFile):
-        super().__init__(dataFile)
-        self.cols = {
-            'order': 3,
-            'icon': 11,
-            'cost': 17,
-            'sell': 18,
-        }
+    game = 'BD'
@@ -1,70 +1,75 @@
-import random
+from Schemas import getSchema
 
 class JOBS:
     def __init__(self, jobFiles, abilities):
         self.abilities = abilities
         self.jobTable = jobFiles.crowdFiles['JobTable.btb']
         self.jobFiles = {}
+        self.jobSchema = getSchema('JobTable.btb', self.game)
+        self.schema = getSchema('JobTable00.btb', self.game)
+        self.stats = {
+            'HP': 'hp',
+            'MP': 'mp',
+            'STR': 'str',
+            'VIT': 'vit',
+            'INT': 'int',
+            'MND': 'mnd',
+            'AGI': 'agi',
+            'DEX': 'dex',
+        }
         
     def zeroJP(self):
         for jobFile in self.jobFiles.values():
-            jobFile.patchCol([0]*jobFile.count, 1) # TOTAL
-            jobFile.patchCol([0]*jobFile.count, 2) # TO NEXT LEVEL
+            jobFile.patchCol([0]*jobFile.count, self.schema.col('totalJP')) # TOTAL
+            jobFile.patchCol([0]*jobFile.count, self.schema.col('nextJP')) # TO NEXT LEVEL
 
     # HP, MP, ....
-    def shuffleAffinities(self):
-        for col in range(4, 12):
+    def shuffleAffinities(self, rng):
+        for key in self.stats.values():
+            col = self.schema.col(key)
             data = [jobFile.readCol(col) for jobFile in self.jobFiles.values()]
-            random.shuffle(data)
+            rng.shuffle(data)
             for di, jobFile in zip(data, self.jobFiles.values()):
                 jobFile.patchCol(di, col)
 
     # Specialty skill
-    def randomSpecialties(self):
+    def randomSpecialties(self, rng):
         candidates = list(self.supportIDs)
-        random.shuffle(candidates)
+        rng.shuffle(candidates)
         for jobFile in self.jobFiles.values():
             value = candidates.pop()
-            jobFile.patchValue(value, 0, 12)
+            jobFile.patchValue(value, 0, self.schema.col('specialty'))
 
     # PRINTOUTS!
-    def print(self):
-        print('==============')
-        print('JOB AFFINITIES')
-        print('==============')
-        print('')
-        print('')
-        stats = {
-            'HP': 4,
-            'MP': 5,
-            'STR': 6,
-            'VIT': 7,
-            'INT': 8,
-            'MND': 9,
-            'AGI': 10,
-            'DEX': 11,
-        }
+    def print(self, file=None):
+        print('==============', file=file)
+        print('JOB AFFINITIES', file=file)
+        print('==============', file=file)
+        print('', file=file)
+        print('', file=file)
         header = ' '*20
-        for key in stats:
+        for key in self.stats:
             header += key.rjust(6, ' ')
-        print(header)
+        print(header, file=file)
         for job, jobFile in self.jobFiles.items():
             line = job.rjust(20, ' ')
-            for col in stats.values():
-                stat = jobFile.readValue(0, col)
+            for key in self.stats.values():
+                stat = jobFile.readValue(0, self.schema.col(key))
                 line += f"{stat}%".rjust(6)
-            print(line)
-        print('')
-        print('')
-        print('')
+            print(line, file=file)
+        print('', file=file)
+        print('', file=file)
+        print('', file=file)
 
 
 class JOBS_BD(JOBS):
+    game = 'BD'
+
     def __init__(self, jobFiles, abilities):
         super().__init__(jobFiles, abilities)
 
-        names = self.jobTable.readTextStringAll(2)
-        index = self.jobTable.readCol(1)
+        names = self.jobTable.readTextStringAll(self.jobSchema.col('name'))
+        index = self.jobTable.readCol(self.jobSchema.col('index'))
         indexToName = {i:n for i,n in zip(index, names)}
         for i in range(24):
             idx = str(i).rjust(2, '0')
@@ -76,75 +81,77 @@ class JOBS_BD(JOBS):
         # (NB: loading directly from their files would lead to some useless abilities, e.g. spellcrafts)
         allAbilities = set()
         for jobFile in self.jobFiles.values():
-            allAbilities.add( jobFile.readValue(0, 12) ) # Specialty
-            allAbilities.update(jobFile.readCol(13)) # Commands & Support
+            allAbilities.add( jobFile.readValue(0, self.schema.col('specialty')) ) # Specialty
+            allAbilities.update(jobFile.readCol(self.schema.col('abilId'))) # Commands & Support
         allAbilities = sorted(filter(lambda x: x, allAbilities))
         self.commandIDs = list(filter(lambda x: x < 1000, allAbilities))
         self.supportIDs = list(filter(lambda x: x >= 1000, allAbilities))
 
     # Support abilities
-    def shuffleSupport(self):
+    def shuffleSupport(self, rng):
         candidates = list(self.supportIDs)
-        random.shuffle(candidates)
+        rng.shuffle(candidates)
         for jobFile in self.jobFiles.values():
-            abilities = jobFile.readCol(13)
+            abilities = jobFile.readCol(self.schema.col('abilId'))
             for i in range(len(abilities)):
                 if abilities[i] >= 1000:
                     abilities[i] = candidates.pop()
-            jobFile.patchCol(abilities, 13)
+            jobFile.patchCol(abilities, self.schema.col('abilId'))
 
     # Shuffle commands (non-mages)
-    def shuffleCommands(self):
+    def shuffleCommands(self, rng):
         candidates = list(self.commandIDs)
-        random.shuffle(candidates)
+        rng.shuffle(candidates)
         for jobFile in self.jobFiles.values():
-            abilities = jobFile.readCol(13)
+            abilities = jobFile.readCol(self.schema.col('abilId'))
             for i in range(len(abilities)):
                 if abilities[i] and abilities[i] < 1000:
                     abilities[i] = candidates.pop()
-            jobFile.patchCol(abilities, 13)
+            jobFile.patchCol(abilities, self.schema.col('abilId'))
 
-    def printAbilities(self):
-        print('=============')
-        print('JOB ABILITIES')
-        print('=============')
-        print('')
-        print('')
+    def printAbilities(self, file=None):
+        print('=============', file=file)
+        print('JOB ABILITIES', file=file)
+        print('=============', file=file)
+        print('', file=file)
+        print('', file=file)
         for job, jobFile in self.jobFiles.items():
-            print(job)
-            print('-'*len(job))
-            print('')
-            specID = jobFile.readValue(0, 12)
-            print('  Specialty:', self.abilities.getName(specID))
-            print('')
-            print('  Abilities:')
-            abilIds = jobFile.readCol(13)
-            jobComm = jobFile.readCol(16)
+            print(job, file=file)
+            print('-'*len(job), file=file)
+            print('', file=file)
+            specID = jobFile.readValue(0, self.schema.col('specialty'))
+            print('  Specialty:', self.abilities.getName(specID), file=file)
+            print('', file=file)
+            print('  Abilities:', file=file)
+            abilIds = jobFile.readCol(self.schema.col('abilId'))
+            jobComm = jobFile.readCol(self.schema.col('jobComId'))
             for level, (abilId, jobComId) in enumerate(zip(abilIds, jobComm)):
                 if abilId == 0:
                     # Magic/Summon level
-                    print(f'  {level+1} '.rjust(7, ' '), self.abilities.getName(jobComId))
+                    print(f'  {level+1} '.rjust(7, ' '), self.abilities.getName(jobComId), file=file)
                 elif abilId < 1000:
                     # Command
-                    print(f'  {level+1} '.rjust(7, ' '), self.abilities.getName(abilId).ljust(20, ' '))
+                    print(f'  {level+1} '.rjust(7, ' '), self.abilities.getName(abilId).ljust(20, ' '), file=file)
                 else:
                     # Support
-                    print(f'  {level+1} '.rjust(7, ' '), self.abilities.getName(abilId).ljust(20, ' '), f'{self.abilities.getSupCosts(abilId)} SP')
-            print('')
-            print('')
-        print('')
-        print('')
+                    print(f'  {level+1} '.rjust(7, ' '), self.abilities.getName(abilId).ljust(20, ' '), f'{self.abilities.getSupCosts(abilId)} SP', file=file)
+            print('', file=file)
+            print('', file=file)
+        print('', file=file)
+        print('', file=file)
         
-    def print(self):
-        super().print()
-        self.printAbilities()
+    def print(self, file=None):
+        super().print(file)
+        self.printAbilities(file)
 
 
 class JOBS_BS(JOBS):
+    game = 'BS'
+
     def __init__(self, jobFiles, abilities):
         super().__init__(jobFiles, abilities)
 
-        names = self.jobTable.readTextStringAll(2)
+        names = self.jobTable.readTextStringAll(self.jobSchema.col('name'))
         for i, name in enumerate(names):
             idx = str(i).rjust(2, '0')
             fileName = f"JobTable{idx}.btb"
@@ -154,8 +161,8 @@ class JOBS_BS(JOBS):
         # (NB: loading directly from their files would lead to some useless abilities, e.g. spellcrafts)
         allAbilities = set()
         for jobFile in self.jobFiles.values():
-            allAbilities.add( jobFile.readValue(0, 12) ) # Specialty
-            allAbilities.update(jobFile.readCol(13)) # Commands & Support
+            allAbilities.add( jobFile.readValue(0, self.schema.col('specialty')) ) # Specialty
+            allAbilities.update(jobFile.readCol(self.schema.col('abilId'))) # Commands & Support
         allAbilities = sorted(filter(lambda x: x, allAbilities))
         self.commandIDs = list(filter(lambda x: x < 20000, allAbilities))
         self.supportIDs = list(filter(lambda x: x >= 20000, allAbilities))
@@ -225,10 +232,10 @@ class JOBS_BS(JOBS):
         }
 
     # Equipment
-    def shuffleAptitudes(self):
+    def shuffleAptitudes(self, rng):
         for col in range(9, 25): # NB: cols 20, 23, and 25 are all 200 and probably unused
             data = self.jobTable.readCol(col)
-            random.shuffle(data)
+            rng.shuffle(data)
 
             ##### Any X Lore support skill require the corresponding aptitude be 200
             if col in self.colToLore:
@@ -236,22 +243,23 @@ class JOBS_BS(JOBS):
                 vanillaJobWithLore = self.loreIds[loreId]
                 i = self.aptJobToRow[vanillaJobWithLore]
                 s = [d == 200 for d in data]
-                j = random.choices(range(len(s)), s, k=1)[0]
+                j = rng.choices(range(len(s)), s, k=1)[0]
                 data[i], data[j] = data[j], data[i]
                 assert data[i] == 200
             
             self.jobTable.patchCol(data, col)
 
     # Support abilities
-    def shuffleSupport(self):
+    def shuffleSupport(self, rng):
         ## TEMPORARY FIX: ALSO MODIFIES JOBID COLUMN IN SUPABIL FILE
         ## THERE SEEMS TO BE NO NEED FOR THIS IN BS
         ## TODO: TEST TO SEE WHY IT EXISTS IN BD; ANY SIDE EFFECTS IN BD/BS
-        jobIds = self.abilities.supAbilFile.readCol(2)
+        jobIdCol = self.abilities.supAbilSchema.col('jobId')
+        jobIds = self.abilities.supAbilFile.readCol(jobIdCol)
         candidates = list(self.supportIDs)
-        random.shuffle(candidates)
+        rng.shuffle(candidates)
         for job, jobFile in self.jobFiles.items():
-            abilities = jobFile.readCol(13)
+            abilities = jobFile.readCol(self.schema.col('abilId'))
             for i in range(len(abilities)):
                 if abilities[i] >= 20000:
                     row = self.abilities.getSupRow(abilities[i])
@@ -259,28 +267,28 @@ class JOBS_BS(JOBS):
                     abilId = candidates.pop()
                     abilities[i] = abilId
                     row2 = self.abilities.getSupRow(abilities[i])
-                    self.abilities.supAbilFile.patchValue(jobId, row2, 2)
+                    self.abilities.supAbilFile.patchValue(jobId, row2, jobIdCol)
                     if abilId in self.loreIds:
                         self.loreInJobs[abilId] = job
-            jobFile.patchCol(abilities, 13)
+            jobFile.patchCol(abilities, self.schema.col('abilId'))
 
     # Shuffle commands (non-mages)
-    def shuffleCommands(self):
+    def shuffleCommands(self, rng):
         candidates = list(self.commandIDs)
-        random.shuffle(candidates)
+        rng.shuffle(candidates)
         for jobFile in self.jobFiles.values():
-            abilities = jobFile.readCol(13)
+            abilities = jobFile.readCol(self.schema.col('abilId'))
             for i in range(len(abilities)):
                 if abilities[i] and abilities[i] < 20000:
                     abilities[i] = candidates.pop()
-            jobFile.patchCol(abilities, 13)
+            jobFile.patchCol(abilities, self.schema.col('abilId'))
 
-    def printAptitudes(self):
-        print('=============')
-        print('JOB APTITUDES')
-        print('=============')
-        print('')
-        print('')
+    def printAptitudes(self, file=None):
+        print('=============', file=file)
+        print('JOB APTITUDES', file=file)
+        print('=============', file=file)
+        print('', file=file)
+        print('', file=file)
         equip = {
             'Swords': 9,
             'Axes': 10,
@@ -308,50 +316,50 @@ class JOBS_BS(JOBS):
         header = ' '*20
         for key in equip:
             header += key.rjust(10, ' ')
-        print(header)
+        print(header, file=file)
         for row, (job, jobFile) in enumerate(self.jobFiles.items()):
             line = job.rjust(20, ' ')
             for col in equip.values():
                 value = self.jobTable.readValue(row, col)
                 line += aptToGrade[value].rjust(10, ' ')
-            print(line)
-        print('')
-        print('')
-        print('')
+            print(line, file=file)
+        print('', file=file)
+        print('', file=file)
+        print('', file=file)
 
-    def printAbilities(self):
-        print('=============')
-        print('JOB ABILITIES')
-        print('=============')
-        print('')
-        print('')
+    def printAbilities(self, file=None):
+        print('=============', file=file)
+        print('JOB ABILITIES', file=file)
+        print('=============', file=file)
+        print('', file=file)
+        print('', file=file)
         for job, jobFile in self.jobFiles.items():
-            print(job)
-            print('-'*len(job))
-            print('')
-            specID = jobFile.readValue(0, 12)
-            print('  Specialty:', self.abilities.getName(specID))
-            print('')
-            print('  Abilities:')
-            abilIds = jobFile.readCol(13)
-            jobComm = jobFile.readCol(14)
-            craftIds = jobFile.readCol(15)
+            print(job, file=file)
+            print('-'*len(job), file=file)
+            print('', file=file)
+            specID = jobFile.readValue(0, self.schema.col('specialty'))
+            print('  Specialty:', self.abilities.getName(specID), file=file)
+            print('', file=file)
+            print('  Abilities:', file=file)
+            abilIds = jobFile.readCol(self.schema.col('abilId'))
+            jobComm = jobFile.readCol(self.schema.col('jobComId'))
+            craftIds = jobFile.readCol(self.schema.col('craftId'))
             for level, (abilId, jobComId, craftId) in enumerate(zip(abilIds, jobComm, craftIds)):
                 id = max(abilId, jobComId, craftId)
                 if id < 3000:
-                    print(f'  {level+1} '.rjust(7, ' '), self.abilities.getName(id))
+                    print(f'  {level+1} '.rjust(7, ' '), self.abilities.getName(id), file=file)
                 elif id < 20000:
-                    print(f'  {level+1} '.rjust(7, ' '), self.abilities.getName(id))
+                    print(f'  {level+1} '.rjust(7, ' '), self.abilities.getName(id), file=file)
                 else:
-                    print(f'  {level+1} '.rjust(7, ' '), self.abilities.getName(id).ljust(20, ' '), f'{self.abilities.getSupCosts(id)} SP')
-            print('')
-            print('')
-        print('')
-        print('')
+                    print(f'  {level+1} '.rjust(7, ' '), self.abilities.getName(id).ljust(20, ' '), f'{self.abilities.getSupCosts(id)} SP', file=file)
+            print('', file=file)
+            print('', file=file)
+        print('', file=file)
+        print('', file=file)
 
         
         
-    def print(self):
-        self.printAptitudes()
-        super().print()
-        self.printAbilities()
+    def print(self, file=None):
+        self.printAptitudes(file)
+        super().print(file)
+        self.printAbilities(file)
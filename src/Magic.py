@@ -1,4 +1,4 @@
-import random
+from Schemas import getSchema
 
 # SHUFFLE ABILITY TABLES and update items
 class MAGIC:
@@ -10,10 +10,11 @@ class MAGIC:
         self.data = {} # USE KEY AS ITEMID (PROBABLY EASIER TO MAP TO STRINGS LATER?)
         for fileName in self.abilities.magicTables:
             fileObj = self.abilities.crowdFiles[fileName]
-            for row in range(fileObj.count):
-                level = fileObj.readValue(row, 0)
-                abilId = fileObj.readValue(row, 1)
-                itemId = fileObj.readValue(row, 2)
+            schema = getSchema(fileName)
+            for row, magic in enumerate(schema.readRows(fileObj)):
+                level = magic.level
+                abilId = magic.abilId
+                itemId = magic.itemId
                 order = self.items.getOrder(itemId)
                 icon = self.items.getIcon(itemId)
                 cost = self.items.getCost(itemId)
@@ -32,26 +33,29 @@ class MAGIC:
                     'itemId': itemId,
                 }
 
-    def shuffleMagic(self):
+    def shuffleMagic(self, rng):
                 
         # Shuffle
         for level in range(1, 8):
             magic = [m for m in self.data.values() if m['level'] == level]
             # Fisher-Yates
             for i in range(len(magic)):
-                j = random.randrange(i, len(magic))
+                j = rng.randrange(i, len(magic))
                 magic[i]['swap'], magic[j]['swap'] = magic[j]['swap'], magic[i]['swap']
 
         # Patch
         for key in self.data:
-            fileObj = self.abilities.crowdFiles[self.data[key]['file']]
+            fileName = self.data[key]['file']
+            fileObj = self.abilities.crowdFiles[fileName]
+            schema = getSchema(fileName)
             row = self.data[key]['row']
             # Load "new" data
             abilId = self.data[key]['swap']['abilId']
             itemId = self.data[key]['swap']['itemId']
             # Patch ability table
-            fileObj.patchValue(abilId, row, 1)
-            fileObj.patchValue(itemId, row, 2)
+            magic = schema.readRow(fileObj, row)
+            magic.abilId, magic.itemId = abilId, itemId
+            schema.patchRow(fileObj, row, magic)
             # Patch item table (for magic shop)
             self.items.changeOrder(itemId, self.data[key]['order'])
             self.items.changeIcon(itemId, self.data[key]['icon'])
@@ -59,42 +63,43 @@ class MAGIC:
 
         ## UPDATE RED MAGE
         redMageFile = self.abilities.crowdFiles['AbilityWBM.btb']
-        abilIdCol = redMageFile.readCol(1)
-        for row, key in enumerate(abilIdCol):
+        schema = getSchema('AbilityWBM.btb')
+        for row, magic in enumerate(schema.readRows(redMageFile)):
             # Load "new" data
-            abilId = self.data[key]['swap']['abilId']
-            itemId = self.data[key]['swap']['itemId']
+            key = magic.abilId
+            magic.abilId = self.data[key]['swap']['abilId']
+            magic.itemId = self.data[key]['swap']['itemId']
             # Patch ability table
-            redMageFile.patchValue(abilId, row, 1)
-            redMageFile.patchValue(itemId, row, 2)
-
-    def print(self):
-        print('')
-        print('')
-        print('')
-        print('====================')
-        print('JOB SPELLS & SUMMONS')
-        print('====================')
-        print('')
-        print('')
+            schema.patchRow(redMageFile, row, magic)
+
+    def print(self, file=None):
+        print('', file=file)
+        print('', file=file)
+        print('', file=file)
+        print('====================', file=file)
+        print('JOB SPELLS & SUMMONS', file=file)
+        print('====================', file=file)
+        print('', file=file)
+        print('', file=file)
         for fileName, name in self.abilities.fileToMage.items():
             fileObj = self.abilities.crowdFiles[fileName]
-            levels = fileObj.readCol(0)
-            comAbilIds = fileObj.readCol(1)
+            schema = getSchema(fileName)
+            levels = fileObj.readCol(schema.col('level'))
+            comAbilIds = fileObj.readCol(schema.col('abilId'))
             data = {i:[] for i in range(1,9)}
             for l, a in zip(levels, comAbilIds):
                 data[l].append(self.abilities.getName(a))
             
-            print(name)
-            print('-'*len(name))
-            print('')
+            print(name, file=file)
+            print('-'*len(name), file=file)
+            print('', file=file)
             for level, magic in data.items():
                 if magic:
-                    print(f' Level {level}:  ', ', '.join(magic))
-            print('')
-            print('')
-        print('')
-        print('')
+                    print(f' Level {level}:  ', ', '.join(magic), file=file)
+            print('', file=file)
+            print('', file=file)
+        print('', file=file)
+        print('', file=file)
 
 
 
@@ -102,6 +107,7 @@ class MAGIC_BD(MAGIC):
     def __init__(self, parameterData, items):
         super().__init__(parameterData, items)
         self.detailInfo = parameterData.crowdFiles['DetailInfoMagicTable.btb']
+        self.detailSchema = getSchema('DetailInfoMagicTable.btb')
         self.filesToCommand = {
             'AbilityWMG.btb': list(range(2001, 2007)),
             'AbilityBMG.btb': list(range(2009, 2015)),
@@ -121,31 +127,34 @@ class MAGIC_BD(MAGIC):
             a = sf['abilId']
             del self.data[a]
 
-    def shuffleMagic(self):
-        super().shuffleMagic()
+    def shuffleMagic(self, rng):
+        super().shuffleMagic(rng)
 
         # Shuffle Spell Fencer
         sfFileObj = self.abilities.crowdFiles['AbilityMGS.btb']
         for key, data in self.data.items():
             fileName = data['file']
             fileObj = self.abilities.crowdFiles[fileName]
-            itemId = fileObj.readValue(data['row'], 2)
+            schema = getSchema(fileName)
+            itemId = fileObj.readValue(data['row'], schema.col('itemId'))
             if itemId in self.spellFencer:
-                if random.random() < 0.5:
+                if rng.random() < 0.5:
                     abilId = data['swap']['abilId']
                     abilIdSF = self.spellFencer[itemId]['abilId']
                     rowSF = self.spellFencer[itemId]['row']
-                    fileObj.patchValue(abilIdSF, data['row'], 1)
-                    sfFileObj.patchValue(abilId, rowSF, 1)
+                    fileObj.patchValue(abilIdSF, data['row'], schema.col('abilId'))
+                    sfFileObj.patchValue(abilId, rowSF, schema.col('abilId'))
 
         # Update detailInfo
-        detailComList = self.detailInfo.readCol(0)
+        detailComList = self.detailInfo.readCol(self.detailSchema.col('comId'))
         comIdToRow = {i:r for r,i in enumerate(detailComList)}
+        edits = []
         for fileName, commandList in self.filesToCommand.items():
             fileObj = self.abilities.crowdFiles[fileName]
-            levels = fileObj.readCol(0)
-            abilIds = fileObj.readCol(1)
-            itemIds = fileObj.readCol(2)
+            schema = getSchema(fileName)
+            levels = fileObj.readCol(schema.col('level'))
+            abilIds = fileObj.readCol(schema.col('abilId'))
+            itemIds = fileObj.readCol(schema.col('itemId'))
             tmp = list(zip(levels, itemIds, abilIds))
             for i, comId in enumerate(commandList):
                 _, iIds, aIds = list(zip(*filter(lambda x: x[0] == i+1, tmp)))
@@ -165,13 +174,15 @@ class MAGIC_BD(MAGIC):
                     string = 'Enables use of:\n' + ', '.join(names[:4]) + '\n' + ', '.join(names[4:])
                 else:
                     string = 'Enables use of:\n' + ', '.join(names)
-                self.detailInfo.patchTextString(string, row, 2)
+                edits.append((string, row, self.detailSchema.col('detail')))
+        self.detailInfo.patchTextStrings(edits, self.detailSchema.textCols())
 
 
 class MAGIC_BS(MAGIC):
     def __init__(self, abilities, items, detailInfoData):
         super().__init__(abilities, items)
-        self.detailInfo = detailInfoData.crowdFiles['DetailInfoMagicTable.btb']
+        self.detailInfo = detailInfoData.crowdFiles['DetailInfoMagicTable.btb'] if detailInfoData else None
+        self.detailSchema = getSchema('DetailInfoMagicTable.btb')
         self.filesToCommand = { # A little complicated to read this from the data.....
             'AbilityWMG.btb': list(range(2001, 2008)),
             'AbilityBMG.btb': list(range(2009, 2016)),
@@ -183,25 +194,26 @@ class MAGIC_BS(MAGIC):
             'AbilityAST.btb': list(range(2089, 2096)),
         }
 
-    def shuffleMagic(self):
-        super().shuffleMagic()
+    def shuffleMagic(self, rng):
+        super().shuffleMagic(rng)
     
         ## SHUFFLE SUMMONS
         summonerFile = self.abilities.crowdFiles['AbilitySMG.btb']
-        abilId = summonerFile.readCol(1)
-        itemId = summonerFile.readCol(2)
+        schema = getSchema('AbilitySMG.btb')
+        abilId = summonerFile.readCol(schema.col('abilId'))
+        itemId = summonerFile.readCol(schema.col('itemId'))
         cols = list(zip(abilId, itemId))
         groups = [ cols[i:i+2] + cols[i+8:i+10] for i in range(0, 8, 2) ]
         for group in groups:
-            random.shuffle(group)
+            rng.shuffle(group)
         newList = []
         for group in groups:
             newList += group[:2]
         for group in groups:
             newList += group[2:]
         abilId, itemId = zip(*newList)
-        summonerFile.patchCol(abilId, 1)
-        summonerFile.patchCol(itemId, 2)
+        summonerFile.patchCol(abilId, schema.col('abilId'))
+        summonerFile.patchCol(itemId, schema.col('itemId'))
 
         ## NEITHER SPELLCRAFT SEEMS TO WORK :(
         ## SHUFFLE SPELLCRAFT --- might need to shuffle items and/or names????
@@ -225,13 +237,17 @@ class MAGIC_BS(MAGIC):
         #         spellcraft[i] = spells.pop(0)
         #     i += 1
 
-        # Update detailInfo
-        detailComList = self.detailInfo.readCol(0)
+        # Update detailInfo (unless it wasn't loaded)
+        if self.detailInfo is None:
+            return
+        detailComList = self.detailInfo.readCol(self.detailSchema.col('comId'))
         comIdToRow = {i:r for r,i in enumerate(detailComList)}
+        edits = []
         for fileName, commandList in self.filesToCommand.items():
             fileObj = self.abilities.crowdFiles[fileName]
-            levels = fileObj.readCol(0)
-            itemIds = fileObj.readCol(2)
+            schema = getSchema(fileName)
+            levels = fileObj.readCol(schema.col('level'))
+            itemIds = fileObj.readCol(schema.col('itemId'))
             tmp = list(zip(levels, itemIds))
             for i, comId in enumerate(commandList):
                 _, ids = list(zip(*filter(lambda x: x[0] == i+1, tmp)))
@@ -246,4 +262,5 @@ class MAGIC_BS(MAGIC):
                     string = 'Enables use of:\n' + ', '.join(names[:4]) + '\n' + ', '.join(names[4:])
                 else:
                     string = 'Enables use of:\n' + ', '.join(names)
-                self.detailInfo.patchTextString(string, row, 2)
+                edits.append((string, row, self.detailSchema.col('detail')))
+        self.detailInfo.patchTextStrings(edits, self.detailSchema.textCols())
@@ -0,0 +1,146 @@
+import os
+import io
+import time
+import shutil
+import tarfile
+import threading
+import zipfile
+from contextlib import contextmanager
+from Classes import createFile
+
+# Where a patch gets written. Files are created by their path under
+# root, the patch directory; packaged outputs store them relative to
+# its parent, so they unpack to the same tree.
+
+class DIRECTORY:
+    # Unless cleared, files of the previous patch stay for reuse
+    def __init__(self, root, clear=True):
+        self.root = root
+        if clear and os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def create(self, fileName):
+        return createFile(fileName)
+
+    def close(self):
+        pass
+
+    def remove(self):
+        shutil.rmtree(self.root)
+
+    # Drop a file or folder of the previous patch
+    def discard(self, fileName):
+        if os.path.isdir(fileName):
+            shutil.rmtree(fileName)
+        elif os.path.isfile(fileName):
+            os.remove(fileName)
+
+    # Finished patch packed as a zip into file, e.g. for the cache
+    def save(self, file):
+        package = ZIP(self.root, file)
+        for dirPath, _, fileNames in os.walk(self.root):
+            for fileName in sorted(fileNames):
+                fileName = os.path.join(dirPath, fileName)
+                with open(fileName, 'rb') as src, package.create(fileName) as dst:
+                    shutil.copyfileobj(src, dst)
+        package.close()
+
+    # Unpack a patch made by save
+    def restore(self, fileName):
+        with zipfile.ZipFile(fileName) as package:
+            package.extractall(os.path.dirname(self.root))
+
+
+class PACKAGE:
+    extension = ''
+
+    def __init__(self, root, file=None):
+        self.root = root
+        self.fileName = None if file else root + self.extension
+        self.file = file if file else self.fileName
+        self.lock = threading.Lock() # One member is written at a time
+        self.closed = False
+
+    def memberName(self, fileName):
+        parent = os.path.dirname(self.root)
+        return os.path.relpath(fileName, parent).replace(os.sep, '/')
+
+    def close(self):
+        if not self.closed:
+            self.package.close()
+            self.closed = True
+
+    def remove(self):
+        self.close()
+        if self.fileName:
+            os.remove(self.fileName)
+
+    # Finished package copied into file
+    def save(self, file):
+        self.close()
+        if self.fileName:
+            with open(self.fileName, 'rb') as src:
+                shutil.copyfileobj(src, file)
+        else:
+            file.write(self.file.getvalue())
+
+    # Replace the package with a saved one. It's copied rather than
+    # linked: the next run writes this file in place.
+    def restore(self, fileName):
+        self.close()
+        if self.fileName:
+            shutil.copyfile(fileName, self.fileName)
+        else:
+            self.file.seek(0)
+            self.file.truncate()
+            with open(fileName, 'rb') as src:
+                shutil.copyfileobj(src, self.file)
+
+
+class ZIP(PACKAGE):
+    extension = '.zip'
+    stored = {'crowd.fs'} # Already deflated
+
+    def __init__(self, root, file=None):
+        super().__init__(root, file)
+        self.package = zipfile.ZipFile(self.file, 'w')
+
+    # Stream straight into the zip
+    @contextmanager
+    def create(self, fileName):
+        info = zipfile.ZipInfo(self.memberName(fileName), time.localtime()[:6])
+        if os.path.basename(fileName) not in self.stored:
+            info.compress_type = zipfile.ZIP_DEFLATED
+        with self.lock, self.package.open(info, 'w') as file:
+            yield file
+
+
+class TAR(PACKAGE):
+    extension = '.tar'
+
+    def __init__(self, root, file=None):
+        super().__init__(root, file)
+        if isinstance(self.file, str):
+            self.package = tarfile.open(self.file, 'w')
+        else:
+            self.package = tarfile.open(fileobj=self.file, mode='w')
+
+    # Tar headers need the size up front, so members are buffered
+    @contextmanager
+    def create(self, fileName):
+        buffer = io.BytesIO()
+        yield buffer
+        info = tarfile.TarInfo(self.memberName(fileName))
+        info.size = buffer.tell()
+        info.mtime = int(time.time())
+        buffer.seek(0)
+        with self.lock:
+            self.package.addfile(info, buffer)
+
+
+OUTPUTS = {
+    'directory': DIRECTORY,
+    'zip': ZIP,
+    'tar': TAR,
+}
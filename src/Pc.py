@@ -1,3 +1,5 @@
+from Schemas import getSchema
+
 # BD: only PCs: 1-4
 # BS: main PCs: 1-4; Janne and Nikolai: 5-6; unknown: 7-9
 class PC:
@@ -8,8 +10,9 @@ class PC:
             if not fileName in dataFiles.crowdFiles:
                 break
             self.dataFiles.append(dataFiles.crowdFiles[fileName])
+        self.schema = getSchema('PcLevelTable001.btb')
 
     def zeroEXP(self):
         for dataFile in self.dataFiles:
-            dataFile.patchCol([0]*99, 1) # TOTAL
-            dataFile.patchCol([0]*99, 2) # NEXT LEVEL
+            dataFile.patchCol([0]*99, self.schema.col('totalEXP')) # TOTAL
+            dataFile.patchCol([0]*99, self.schema.col('nextEXP')) # NEXT LEVEL
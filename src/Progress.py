@@ -0,0 +1,58 @@
+import threading
+from contextlib import contextmanager
+
+class CANCELLED(Exception):
+    pass
+
+
+# Progress of a run, sent to listener (from whichever thread does the
+# work) as events {'phase', 'archive', 'percent'}, like the records of
+# TIMER. Setting cancel stops the run before its next load, step or dump.
+class PROGRESS:
+    # Percent of a run spent in each phase
+    shares = {'load': 30, 'step': 20, 'dump': 45, 'printLogs': 5}
+
+    def __init__(self, listener=None, cancel=None):
+        self.listener = listener
+        self.cancel = cancel if cancel else threading.Event()
+        self.totals = {}
+        self.done = {}
+        self.lock = threading.Lock()
+
+    # Number of tasks of a phase, set before any of them starts
+    def expect(self, phase, total):
+        with self.lock:
+            self.totals[phase] = total
+            self.done[phase] = 0
+
+    def percent(self):
+        percent = 0
+        for phase, total in self.totals.items():
+            share = self.shares.get(phase, 0)
+            percent += share * min(self.done[phase], total) / total if total else share
+        return round(percent, 1)
+
+    def emit(self, phase, archive):
+        if self.listener:
+            with self.lock:
+                percent = self.percent()
+            self.listener({'phase': phase, 'archive': archive, 'percent': percent})
+
+    # Last event of a run, whether or not it had anything left to do
+    def finish(self):
+        if self.listener:
+            self.listener({'phase': 'finished', 'archive': None, 'percent': 100.0})
+
+    def check(self):
+        if self.cancel.is_set():
+            raise CANCELLED('Randomizing was cancelled')
+
+    # Reported when it starts and when it's done
+    @contextmanager
+    def task(self, phase, archive=None):
+        self.check()
+        self.emit(phase, archive)
+        yield
+        with self.lock:
+            self.done[phase] = self.done.get(phase, 0) + 1
+        self.emit(phase, archive)
@@ -7,197 +7,478 @@ from Abilities import ABILITIES_BD, ABILITIES_BS
 from Shop import SHOP, SHOP_BD
 from Magic import MAGIC_BD, MAGIC_BS
 from Treasures import TREASURES
+from Output import OUTPUTS, DIRECTORY
+from Timing import TIMER
+from Progress import PROGRESS
+from Scheduler import STEP, SCHEDULER, raiseArchiveErrors, digest
+from release import RELEASE
+from Verify import fileDigests, ROM_CHECKS
+from functools import partial
+import io
 import os
-import shutil
+import json
 import random
-import sys
+import zlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import hjson
 
+# zlib levels for the 'compression' setting
+COMPRESSION = {
+    'fast': zlib.Z_BEST_SPEED,
+    'default': zlib.Z_DEFAULT_COMPRESSION,
+    'max': zlib.Z_BEST_COMPRESSION,
+}
+
+# Run func on every archive, in parallel, keeping their order
+def mapArchives(action, func, paths):
+    with ThreadPoolExecutor() as executor:
+        futures = {path: executor.submit(func, path) for path in paths}
+    raiseArchiveErrors(action, {path: f.exception() for path, f in futures.items() if f.exception()})
+    return {path: f.result() for path, f in futures.items()}
+
+
+# Vanilla archives, parsed once and cloned for every seed
+class VANILLA:
+    def __init__(self, path):
+        self.path = path
+        self.archives = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def load(self, path):
+        with self.lock:
+            lock = self.locks.setdefault(path, threading.Lock())
+        with lock:
+            if path not in self.archives:
+                fileName = os.path.join(self.path, path)
+                if os.path.isdir(fileName):
+                    self.archives[path] = CROWD(fileName)
+                else:
+                    self.archives[path] = TABLE(fileName)
+        return self.archives[path]
+
+    # Parse every file of the archives up front
+    def loadAll(self, paths):
+        archives = mapArchives('load', self.load, paths)
+        for archive in archives.values():
+            if isinstance(archive, CROWD):
+                archive.prefetch()
+
+
+# Where the patch of these settings is written
+def patchPath(settings):
+    return os.path.join(os.getcwd(), f"patch_{settings['game']}_{settings['seed']}")
+
+
 class ROM:
-    def __init__(self, settings):
+    # Settings every game needs; the others are optional
+    SETTINGS = [
+        'rom', 'game', 'seed',
+        'jobs-commands', 'jobs-magic', 'jobs-specialties', 'jobs-support',
+        'jobs-support-costs', 'jobs-stat-affinities',
+        'qol-exp', 'qol-jp', 'qol-pg', 'qol-teleport-stones', 'qol-mastered-jobs',
+    ]
+    # Optional settings, with their defaults
+    OPTIONS = {'compression': 'default', 'output': 'directory', 'no-exp': False}
+
+    def __init__(self, settings, vanilla=None, output=None, progress=None):
         self.settings = settings
+        self.timer = TIMER()
+        self.progress = progress if progress else PROGRESS()
         self.seed = self.settings['seed']
         self.pathIn = self.settings['rom']
-        self.pathOut = os.path.join(os.getcwd(), f"patch_{self.settings['game']}_{self.seed}")
-        if os.path.isdir(self.pathOut):
-            shutil.rmtree(self.pathOut)
-        os.mkdir(self.pathOut)
+        self.level = COMPRESSION[self.settings.get('compression', 'default')]
+        self.vanilla = vanilla if vanilla else VANILLA(self.pathIn)
+        self.pathOut = patchPath(self.settings)
+        self.previous = {}
+        if output:
+            self.output = output
+        elif self.settings.get('output', 'directory') == 'directory':
+            self.previous = self.readManifest()
+            self.output = DIRECTORY(self.pathOut, clear=not self.previous)
+        else:
+            self.output = OUTPUTS[self.settings['output']](self.pathOut)
+        self.incremental = isinstance(self.output, DIRECTORY)
+
+    # Every step gets its own generator, seeded like the old global
+    # reseeding before each step, so steps don't share state and
+    # existing seeds give the same patches.
+    def rng(self):
+        return random.Random(self.seed)
+
+    # Whole pipeline, after loading
+    def run(self, timings=False):
+        with self.timer.time('schedule'):
+            self.schedule()
+        with self.timer.time('printLogs'):
+            if not self.reuseLogs:
+                with self.progress.task('printLogs'):
+                    self.printLogs()
+            self.printSettings()
+        if self.incremental:
+            self.writeText('manifest.json', json.dumps(self.manifest, indent=2))
+        self.close()
+        self.progress.finish()
+        if timings:
+            self.printTimings()
 
     def fail(self):
-        shutil.rmtree(self.pathOut)
+        self.output.remove()
+
+    def close(self):
+        self.output.close()
+
+    def writeText(self, fileName, text):
+        with self.output.create(os.path.join(self.pathOut, fileName)) as file:
+            file.write(text.encode('utf-8'))
 
     def printSettings(self):
-        filename = os.path.join(self.pathOut, 'settings.json')
-        with open(filename, 'w') as file:
-            hjson.dump(self.settings, file)
-
-    def loadCrowd(self, path):
-        src = os.path.join(self.pathIn, path)
-        dest = os.path.join(self.pathOut, 'romfs', path)
-        shutil.copytree(src, dest)
-        return CROWD(dest)
-
-    def loadTable(self, fileName):
-        src = os.path.join(self.pathIn, fileName)
-        dest = os.path.join(self.pathOut, 'romfs', fileName)
-        base = os.path.dirname(dest)
-        if not os.path.isdir(base):
-            os.makedirs(base)
-        shutil.copy(src, dest)
-        return TABLE(dest)
-
-    def randomize(self):
-        # Shuffles magic among mages
-        if self.settings['jobs-magic']:
-            print('Shuffling spells')
-            random.seed(self.seed)
-            self.magic.shuffleMagic()
+        self.writeText('settings.json', hjson.dumps(self.settings))
 
-        # Shuffle support ability costs
-        if self.settings['jobs-support-costs']:
-            print('Shuffling support ability costs')
-            random.seed(self.seed)
-            self.abilities.shuffleSupportCosts()
+    # What the previous patch in the output folder was built from, see
+    # schedule. It's removed until the new patch is done, so an
+    # interrupted run can't leave a stale one.
+    def readManifest(self):
+        fileName = os.path.join(self.pathOut, 'manifest.json')
+        try:
+            with open(fileName, 'r') as file:
+                manifest = json.load(file)
+            os.remove(fileName)
+        except (OSError, ValueError):
+            return {}
+        return manifest
 
-        # Shuffle affinities (HP, MP, ...)
-        if self.settings['jobs-stat-affinities']:
-            print('Shuffling job stat affinities')
-            random.seed(self.seed)
-            self.jobs.shuffleAffinities()
+    def romfsPath(self, path):
+        return os.path.join(self.pathOut, 'romfs', path)
 
-        # Shuffle specialties
-        if self.settings['jobs-specialties']:
-            print('Randomizing job specialties')
-            random.seed(self.seed)
-            self.jobs.randomSpecialties()
+    # Timings and I/O per archive, written next to the patch
+    def printTimings(self):
+        archives = {}
+        for path, archive in self.archives.items():
+            stats = dict(archive.stats)
+            # Reads and decompression happen in the shared vanilla archive
+            vanilla = self.vanilla.load(path).stats
+            for key in ['bytesRead', 'inflated']:
+                stats[key] += vanilla[key] - self.vanillaStats[path].get(key, 0)
+            stats['ratio'] = archive.stats.ratio()
+            archives[path] = stats
+        report = self.timer.report(seed=self.seed, game=self.settings['game'], archives=archives)
+        with open(f"{self.pathOut}.timings.json", 'w') as file:
+            json.dump(report, file, indent=2)
 
-        
-        # Shuffle command abilities
-        if self.settings['jobs-commands']:
-            print('Shuffling job commands')
-            random.seed(self.seed)
-            self.jobs.shuffleCommands()
+    # Archives are read from the vanilla romfs; only modified ones get written
+    def loadArchive(self, path):
+        with self.progress.task('load', path), self.timer.time('load', path):
+            dest = self.romfsPath(path)
+            isLoaded = path in self.vanilla.archives
+            archive = self.vanilla.load(path)
+            self.vanillaStats[path] = dict(archive.stats) if isLoaded else {}
+            if isinstance(archive, CROWD):
+                return archive.clone(dest, level=self.level)
+            return archive.clone(dest)
+
+    # Battle rewards that actually get rescaled
+    def battleScales(self):
+        scales = {key: self.settings[f"qol-{key}"] for key in ['exp', 'jp', 'pg']}
+        return {key: scale for key, scale in scales.items() if scale != 1}
+
+    # Archives only some options touch
+    def isNeeded(self, attr):
+        if attr == 'battleData':
+            return bool(self.battleScales())
+        if attr == 'pcData':
+            return bool(self.settings.get('no-exp'))
+        if attr == 'detailInfoData':
+            return self.settings['jobs-magic'] # Spell descriptions
+        return True
 
-        # Shuffle support abilities
+    # Load the archives in ARCHIVES the settings need to their attributes;
+    # the others are set to None
+    def loadArchives(self):
+        self.vanillaStats = {}
+        self.loaded = {attr: path for attr, path in self.ARCHIVES.items() if self.isNeeded(attr)}
+        self.progress.expect('load', len(self.loaded))
+        try:
+            self.archives = mapArchives('load', self.loadArchive, self.loaded.values())
+        except Exception:
+            self.fail()
+            raise
+        for attr, path in self.ARCHIVES.items():
+            setattr(self, attr, self.archives.get(path))
+
+    def dumpArchive(self, path):
+        with self.progress.task('dump', path), self.timer.time('dump', path) as record:
+            record['written'] = self.archives[path].dump(self.output)
+        return record['written']
+
+    # Randomizer steps, in the order they run sequentially. Each declares
+    # the table columns (or shared state) it reads and writes, so steps
+    # that don't conflict can run concurrently.
+    def randomizeSteps(self):
+        steps = []
+        if self.settings['jobs-magic']:
+            steps.append(STEP('shuffleMagic', lambda: self.magic.shuffleMagic(self.rng()),
+                message='Shuffling spells',
+                reads=['ItemTable.btb:name'],
+                writes=['Ability???.btb', 'ItemTable.btb:order', 'ItemTable.btb:icon',
+                        'ItemTable.btb:cost', 'ItemTable.btb:sell', 'DetailInfoMagicTable.btb'],
+            ))
+        if self.settings['jobs-support-costs']:
+            steps.append(STEP('shuffleSupportCosts', lambda: self.abilities.shuffleSupportCosts(self.rng()),
+                message='Shuffling support ability costs',
+                writes=['SupportAbility.btb:cost'],
+            ))
+        if self.settings['jobs-stat-affinities']:
+            steps.append(STEP('shuffleAffinities', lambda: self.jobs.shuffleAffinities(self.rng()),
+                message='Shuffling job stat affinities',
+                writes=[f"JobTable??.btb:{key}" for key in self.jobs.stats.values()],
+            ))
+        if self.settings['jobs-specialties']:
+            steps.append(STEP('randomSpecialties', lambda: self.jobs.randomSpecialties(self.rng()),
+                message='Randomizing job specialties',
+                writes=['JobTable??.btb:specialty'],
+            ))
+        if self.settings['jobs-commands']:
+            steps.append(STEP('shuffleCommands', lambda: self.jobs.shuffleCommands(self.rng()),
+                message='Shuffling job commands',
+                writes=['JobTable??.btb:abilId'],
+            ))
         if self.settings['jobs-support']:
-            print('Shuffling job support')
-            random.seed(self.seed)
-            self.jobs.shuffleSupport()
-        
-    def qualityOfLife(self):
+            steps.append(STEP('shuffleSupport', lambda: self.jobs.shuffleSupport(self.rng()),
+                message='Shuffling job support',
+                writes=['JobTable??.btb:abilId', 'SupportAbility.btb:jobId', 'jobs.loreInJobs'],
+            ))
+        return steps
 
+    def qualityOfLifeSteps(self):
+        steps = []
         if self.settings['qol-mastered-jobs']:
-            print('Jobs will be Mastered!')
-            self.jobs.zeroJP()
+            steps.append(STEP('zeroJP', self.jobs.zeroJP,
+                message='Jobs will be Mastered!',
+                writes=['JobTable??.btb:totalJP', 'JobTable??.btb:nextJP'],
+            ))
+        if self.settings.get('no-exp'):
+            steps.append(STEP('zeroEXP', self.pcs.zeroEXP,
+                message='Start at level 99!',
+                writes=['PcLevelTable???.btb:totalEXP', 'PcLevelTable???.btb:nextEXP'],
+            ))
+        if self.settings['qol-teleport-stones']:
+            steps.append(STEP('freeTeleportStones', lambda: self.items.changeCostByName('Teleport Stone', 0),
+                message='Teleport Stones will be free!',
+                reads=['ItemTable.btb:name'],
+                writes=['ItemTable.btb:cost', 'ItemTable.btb:sell'],
+            ))
+        # BATTLE STUFF (scaling by 1 is a no-op)
+        scales = self.battleScales()
+        names = {'exp': 'experience', 'jp': 'JP', 'pg': 'pg'}
+        for key, scale in scales.items():
+            func = getattr(self.battles, f"scale{key.upper()}")
+            steps.append(STEP(f"scale{key.upper()}", partial(func, scale),
+                message=f"Rescaling {names[key]} gained by {scale}",
+                writes=[f"MonsterData.btb:{key}"],
+                params=[scale],
+            ))
+        return steps
 
-        if 'no-exp'in self.settings:
-            if self.settings['no-exp']:
-                print('Start at level 99!')
-                self.pcs.zeroEXP()
+    # Files the loaded archives were read from
+    def sourceFiles(self):
+        files = []
+        for path in self.loaded.values():
+            if os.path.isdir(os.path.join(self.vanilla.path, path)):
+                files += [f"{path}/index.fs", f"{path}/crowd.fs"]
+            else:
+                files.append(path)
+        return files
 
-        if self.settings['qol-teleport-stones']:
-            print('Teleport Stones will be free!')
-            self.items.changeCostByName('Teleport Stone', 0)
-
-        # BATTLE STUFF
-        print('Rescaling experience gained by', self.settings['qol-exp'])
-        self.battles.scaleEXP(self.settings['qol-exp'])
-        print('Rescaling JP gained by', self.settings['qol-jp'])
-        self.battles.scaleJP(self.settings['qol-jp'])
-        print('Rescaling pg gained by', self.settings['qol-pg'])
-        self.battles.scalePG(self.settings['qol-pg'])
-        
+    # Everything a patch depends on besides its steps. The release
+    # stands for the code, whatever the settings say. Only patches in
+    # a directory get reused, so only they pay for hashing the romfs
+    # (unchanged files are remembered in the checks sidecar).
+    def base(self):
+        sources = None
+        if self.incremental:
+            sources = fileDigests(self.vanilla.path, self.sourceFiles(), ROM_CHECKS)
+        return digest([self.settings['game'], self.seed, self.level, RELEASE, sources])
+
+    # An archive of the previous patch is kept if the steps writing it
+    # are unchanged and its files are still there
+    def isReusable(self, path, version):
+        previous = self.previous.get('archives', {}).get(path)
+        if not previous or previous['version'] != version:
+            return False
+        return previous['written'] == os.path.exists(self.romfsPath(path))
+
+    # Run the steps, dumping archives as soon as their last writer is
+    # done. The manifest records the version of each archive and of the
+    # logs, i.e. the versions of the steps they come from. When the
+    # previous patch of this seed has the same version, its files are
+    # kept and only the steps needed for the others are run.
+    def schedule(self):
+        steps = self.randomizeSteps() + self.qualityOfLifeSteps()
+        logs = STEP('printLogs', self.printLogs, reads=self.LOGS)
+        scheduler = SCHEDULER(steps + [logs], self.TABLES)
+        base = self.base()
+        versions = scheduler.versions(base)
+
+        self.manifest = {'archives': {}, 'logs': versions[logs]}
+        reuse = set()
+        for attr, path in self.loaded.items():
+            writers = sorted(versions[s] for s in steps if attr in scheduler.archivesOf(s))
+            version = digest([base, path] + writers)
+            self.manifest['archives'][path] = {'version': version}
+            if self.isReusable(path, version):
+                self.manifest['archives'][path]['written'] = self.previous['archives'][path]['written']
+                reuse.add(attr)
+        self.reuseLogs = self.previous.get('logs') == versions[logs] \
+            and os.path.isfile(os.path.join(self.pathOut, 'spoiler.log'))
+
+        # Files of archives that are rebuilt or no longer patched go first
+        kept = {self.loaded[attr] for attr in reuse}
+        for path in self.previous.get('archives', {}):
+            if path not in kept:
+                self.output.discard(self.romfsPath(path))
+
+        targets = [s for s in steps if scheduler.archivesOf(s) - reuse]
+        if not self.reuseLogs:
+            targets.append(logs)
+        steps = [s for s in scheduler.needed(targets) if s is not logs]
+
+        def runStep(step):
+            with self.progress.task('step', step.name), self.timer.time('step', step.name):
+                step.run()
+
+        def dumpArchive(attr):
+            path = self.ARCHIVES[attr]
+            self.archives[path].seal()
+            self.manifest['archives'][path]['written'] = self.dumpArchive(path)
+
+        self.progress.expect('step', len(steps))
+        self.progress.expect('dump', len(self.loaded) - len(reuse))
+        self.progress.expect('printLogs', 0 if self.reuseLogs else 1)
+        SCHEDULER(steps, self.TABLES).run(self.loaded, runStep, dumpArchive, reuse)
 
 class BS(ROM):
-    def __init__(self, settings):
-        super().__init__(settings)
+    ARCHIVES = {
+        'itemTable': 'Common_en/Parameter/Item/ItemTable.btb',
+        'abilityData': 'Common_en/Parameter/Ability', # ABILITIES & SUPPORT
+        'jobData': 'Common_en/Parameter/Job',
+        'shopData': 'Common_en/Shop',
+        'pcData': 'Common_en/Parameter/Pc',
+        'battleData': 'Common_en/Battle',
+        'detailInfoData': 'Common_en/Parameter/DetailInfo',
+    }
+    # Archive of the tables steps patch
+    TABLES = {
+        'ItemTable.btb': 'itemTable',
+        'Ability???.btb': 'abilityData',
+        'SupportAbility.btb': 'abilityData',
+        'JobTable.btb': 'jobData',
+        'JobTable??.btb': 'jobData',
+        'PcLevelTable???.btb': 'pcData',
+        'MonsterData.btb': 'battleData',
+        'DetailInfoMagicTable.btb': 'detailInfoData',
+    }
+    # What printLogs reads
+    LOGS = ['JobTable.btb', 'JobTable??.btb', 'Ability???.btb', 'SupportAbility.btb', 'ItemTable.btb:name']
+    SETTINGS = ROM.SETTINGS + ['jobs-equip-aptitudes']
+
+    def __init__(self, settings, vanilla=None, output=None, progress=None):
+        super().__init__(settings, vanilla, output, progress)
 
         # Load data
-        self.itemTable = self.loadTable('Common_en/Parameter/Item/ItemTable.btb')
-        self.abilityData = self.loadCrowd('Common_en/Parameter/Ability')
-        self.jobData = self.loadCrowd('Common_en/Parameter/Job')
-        self.shopData = self.loadCrowd('Common_en/Shop')
-        self.pcData = self.loadCrowd('Common_en/Parameter/Pc')
-        self.battleData = self.loadCrowd('Common_en/Battle')
-        self.detailInfoData = self.loadCrowd('Common_en/Parameter/DetailInfo')
+        self.loadArchives()
+        self.jobData.prefetch() # Every job table gets parsed
 
         # Manip data
-        self.pcs = PC(self.pcData)
+        self.pcs = PC(self.pcData) if self.pcData else None
         self.items = ITEMS(self.itemTable)
-        self.battles = BATTLES(self.battleData)
+        self.battles = BATTLES(self.battleData) if self.battleData else None
         self.abilities = ABILITIES_BS(self.abilityData)
         self.shops = SHOP(self.shopData)
         self.jobs = JOBS_BS(self.jobData, self.abilities)
         self.magic = MAGIC_BS(self.abilities, self.items, self.detailInfoData)
 
-    def dumpFiles(self):
-        self.jobData.dump()
-        self.abilityData.dump() # ABILITIES & SUPPORT
-        self.shopData.dump()
-        self.itemTable.dump()
-        self.pcData.dump()
-        self.battleData.dump()
-        self.detailInfoData.dump()
-
-    def randomize(self):
-        super().randomize()
-        
+    def randomizeSteps(self):
+        steps = super().randomizeSteps()
+
         # Shuffle equipment grades (S, A, ...)
-        # Must stay AFTER shuffling skills
+        # Must stay AFTER shuffling skills (reads the lore they place)
         if self.settings['jobs-equip-aptitudes']:
-            print('Shuffling job equipment aptitudes')
-            random.seed(self.seed)
-            self.jobs.shuffleAptitudes()
+            steps.append(STEP('shuffleAptitudes', lambda: self.jobs.shuffleAptitudes(self.rng()),
+                message='Shuffling job equipment aptitudes',
+                reads=['jobs.loreInJobs'],
+                writes=['JobTable.btb:aptitudes'],
+            ))
+        return steps
 
     def printLogs(self):
-        temp = sys.stdout
-        sys.stdout = open(os.path.join(self.pathOut, 'spoiler.log'), 'w', encoding='utf-8')
-        self.jobs.print()
-        self.magic.print()
-        sys.stdout = temp
+        log = io.StringIO()
+        self.jobs.print(log)
+        self.magic.print(log)
+        self.writeText('spoiler.log', log.getvalue())
         
 
 
 
 class BD(ROM):
-    def __init__(self, settings):
-        super().__init__(settings)
+    ARCHIVES = {
+        'parameterData': 'Common_en/Paramater',
+        'treasureData': 'Common_en/TreasureTable',
+        'battleData': 'Common_en/Battle',
+        'shopData': 'Common_en/Shop',
+    }
+    # Archive of the tables steps patch
+    TABLES = {
+        'ItemTable.btb': 'parameterData',
+        'Ability???.btb': 'parameterData',
+        'SupportAbility.btb': 'parameterData',
+        'JobTable??.btb': 'parameterData',
+        'PcLevelTable???.btb': 'parameterData',
+        'DetailInfoMagicTable.btb': 'parameterData',
+        '*.trb': 'treasureData',
+        'MonsterData.btb': 'battleData',
+    }
+    # What printLogs reads
+    LOGS = ['JobTable??.btb', 'Ability???.btb', 'SupportAbility.btb', 'ItemTable.btb:name', '*.trb']
+    SETTINGS = ROM.SETTINGS + ['treasures']
+
+    def __init__(self, settings, vanilla=None, output=None, progress=None):
+        super().__init__(settings, vanilla, output, progress)
 
         # Load data
-        self.parameterData = self.loadCrowd('Common_en/Paramater')
-        self.treasureData = self.loadCrowd('Common_en/TreasureTable')
-        self.battleData = self.loadCrowd('Common_en/Battle')
-        self.shopData = self.loadCrowd('Common_en/Shop')
+        self.loadArchives()
+        if self.settings['treasures']:
+            self.treasureData.prefetch() # Every treasure table gets shuffled
         
         # Manip data
         self.pcs = PC(self.parameterData)
         self.items = ITEMS_BD(self.parameterData)
-        self.battles = BATTLES_BD(self.battleData)
+        self.battles = BATTLES_BD(self.battleData) if self.battleData else None
         self.abilities = ABILITIES_BD(self.parameterData)
         self.treasures = TREASURES(self.treasureData, self.items)
         self.shops = SHOP_BD(self.shopData, self.parameterData)
         self.jobs = JOBS_BD(self.parameterData, self.abilities)
         self.magic = MAGIC_BD(self.abilities, self.items)
 
-    def dumpFiles(self):
-        self.treasureData.dump()
-        self.parameterData.dump()
-        self.battleData.dump()
-        self.shopData.dump()
-
-    def randomize(self):
-        super().randomize()
+    def randomizeSteps(self):
+        steps = super().randomizeSteps()
 
         # Shuffle treasures
         if self.settings['treasures']:
-            print('Shuffling treasures')
-            random.seed(self.seed)
-            self.treasures.shuffleTreasures()
+            steps.append(STEP('shuffleTreasures', lambda: self.treasures.shuffleTreasures(self.rng()),
+                message='Shuffling treasures',
+                reads=['ItemTable.btb:id', 'ItemTable.btb:name'],
+                writes=['*.trb'],
+            ))
+        return steps
             
     def printLogs(self):
-        temp = sys.stdout
-        sys.stdout = open(os.path.join(self.pathOut, 'spoiler.log'), 'w', encoding='utf-8')
-        self.jobs.print()
-        self.magic.print()
-        self.treasures.print()
-        sys.stdout = temp
+        log = io.StringIO()
+        self.jobs.print(log)
+        self.magic.print(log)
+        self.treasures.print(log)
+        self.writeText('spoiler.log', log.getvalue())
+
+
+GAMES = {'BD': BD, 'BS': BS}
@@ -0,0 +1,144 @@
+import json
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from Progress import CANCELLED
+
+log = logging.getLogger('randomizer')
+
+# Errors of a batch of archives, reported per archive
+class ArchiveError(Exception):
+    def __init__(self, action, errors):
+        self.errors = errors
+        lines = [f"{path}: {type(e).__name__}: {e}" for path, e in errors.items()]
+        super().__init__(f"Failed to {action} " + '; '.join(lines))
+
+# A cancelled run is reported as such, not as a failed archive
+def raiseArchiveErrors(action, errors):
+    for e in errors.values():
+        if isinstance(e, CANCELLED):
+            raise e
+    if errors:
+        raise ArchiveError(action, errors)
+
+# A randomizer step and the data it touches. Resources are 'table:column',
+# a whole 'table', or the name of some shared state (e.g. 'jobs.loreInJobs').
+# Params are the settings the result depends on besides the seed.
+class STEP:
+    def __init__(self, name, func, reads=(), writes=(), message=None, params=()):
+        self.name = name
+        self.func = func
+        self.reads = set(reads)
+        self.writes = set(writes)
+        self.message = message
+        self.params = list(params)
+
+    def run(self):
+        if self.message:
+            log.info(self.message)
+        self.func()
+
+    # Steps conflict unless neither writes anything the other touches
+    def conflicts(self, other):
+        return overlaps(self.writes, other.reads | other.writes) or overlaps(self.reads, other.writes)
+
+
+def splitResource(resource):
+    table, _, column = resource.partition(':')
+    return table, column
+
+def digest(values):
+    return hashlib.sha256(json.dumps(values).encode('utf-8')).hexdigest()
+
+def overlaps(resourcesA, resourcesB):
+    for a in resourcesA:
+        tableA, colA = splitResource(a)
+        for b in resourcesB:
+            tableB, colB = splitResource(b)
+            if tableA == tableB and (not colA or not colB or colA == colB):
+                return True
+    return False
+
+
+# Runs steps on a thread pool. A step waits for every earlier step it
+# conflicts with, so results match running them in order. Each archive
+# is dumped as soon as the last step writing to it is done.
+class SCHEDULER:
+    def __init__(self, steps, tables, workers=None):
+        self.steps = steps
+        self.tables = tables # table -> archive
+        self.workers = workers
+
+    def archivesOf(self, step):
+        archives = set()
+        for resource in step.writes:
+            table, _ = splitResource(resource)
+            if table in self.tables:
+                archives.add(self.tables[table])
+        return archives
+
+    # Last step writing to each archive (None for archives nobody writes to)
+    def lastWriters(self, archives):
+        last = dict.fromkeys(archives)
+        for step in self.steps:
+            for archive in self.archivesOf(step):
+                assert archive in last, f"Step {step.name} writes to unknown archive {archive}"
+                last[archive] = step
+        return last
+
+    # Digest of what each step leaves behind: its name and params, and
+    # the digests of the earlier steps it depends on. Equal digests
+    # across runs mean equal results.
+    def versions(self, base):
+        versions = {}
+        for i, step in enumerate(self.steps):
+            deps = [versions[s] for s in self.steps[:i] if step.conflicts(s)]
+            versions[step] = digest([base, step.name, step.params] + deps)
+        return versions
+
+    # Steps that must run to redo targets: the targets and every
+    # earlier step they depend on, in order
+    def needed(self, targets):
+        needed = set(targets)
+        for i in reversed(range(len(self.steps))):
+            if self.steps[i] in needed:
+                needed.update(s for s in self.steps[:i] if self.steps[i].conflicts(s))
+        return [s for s in self.steps if s in needed]
+
+    # Archives maps each archive to the name its errors are reported
+    # under. Archives in reuse are kept from a previous run, so aren't
+    # dumped.
+    def run(self, archives, runStep, dumpArchive, reuse=()):
+        last = self.lastWriters(archives)
+        futures = {}
+
+        def wait(steps):
+            for step in steps:
+                futures[step].result()
+
+        def stepTask(step, deps):
+            wait(deps)
+            runStep(step)
+
+        def dumpTask(archive, deps):
+            wait(deps)
+            dumpArchive(archive)
+
+        # Tasks are queued in order and each only waits on earlier ones,
+        # so a bounded pool can't deadlock
+        with ThreadPoolExecutor(self.workers) as executor:
+            dumps = {}
+            for archive, writer in last.items():
+                if writer is None and archive not in reuse:
+                    dumps[archive] = executor.submit(dumpTask, archive, [])
+            for i, step in enumerate(self.steps):
+                deps = [s for s in self.steps[:i] if step.conflicts(s)]
+                futures[step] = executor.submit(stepTask, step, deps)
+                for archive, writer in last.items():
+                    if writer is step and archive not in reuse:
+                        writers = [s for s in self.steps[:i+1] if archive in self.archivesOf(s)]
+                        dumps[archive] = executor.submit(dumpTask, archive, writers)
+        # Report the first failed step, else every failed dump
+        for future in futures.values():
+            future.result()
+        raiseArchiveErrors('dump', {archives[a]: f.exception() for a, f in dumps.items() if f.exception()})
@@ -0,0 +1,123 @@
+import struct
+from fnmatch import fnmatch
+
+# Row of a table with only the named columns
+class RECORD:
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for key, value in zip(self.__slots__, values):
+            setattr(self, key, value)
+
+    def values(self):
+        return tuple(getattr(self, key) for key in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f"{key}={getattr(self, key)}" for key in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+# Named columns of a table, compiled to a struct for whole-row access.
+# Columns are given by index, or (index, type) for types other than 'int'.
+class SCHEMA:
+    types = {
+        'int': 'i',   # signed 4 byte values
+        'uint': 'I',  # unsigned 4 byte values
+        'text': 'i',  # offsets into the text block
+    }
+
+    def __init__(self, name, /, **columns):
+        self.name = name
+        self.cols = {}
+        self.texts = set()
+        formats = {}
+        for key, col in columns.items():
+            ctype = 'int'
+            if isinstance(col, tuple):
+                col, ctype = col
+            assert col not in formats, f"{name}: column {col} is named twice"
+            self.cols[key] = col
+            formats[col] = self.types[ctype]
+            if ctype == 'text':
+                self.texts.add(key)
+        # Cover every column up to the last named one, so rows can be repacked
+        numCols = max(formats) + 1
+        self.struct = struct.Struct('<' + ''.join(formats.get(c, 'i') for c in range(numCols)))
+        self.keys = sorted(self.cols, key=self.cols.get)
+        self.record = type(name, (RECORD,), {'__slots__': tuple(self.keys)})
+
+    def __contains__(self, key):
+        return key in self.cols
+
+    def col(self, key):
+        return self.cols[key]
+
+    def isText(self, key):
+        return key in self.texts
+
+    def textCols(self):
+        return sorted(self.cols[key] for key in self.texts)
+
+    def readRow(self, dataFile, row):
+        values = self.struct.unpack_from(dataFile.data, dataFile.base + row*dataFile.stride)
+        return self.record(*[values[self.cols[key]] for key in self.keys])
+
+    def readRows(self, dataFile):
+        return [self.readRow(dataFile, row) for row in range(dataFile.count)]
+
+    def patchRow(self, dataFile, row, record):
+        dataFile.materialize()
+        address = dataFile.base + row*dataFile.stride
+        values = list(self.struct.unpack_from(dataFile.data, address))
+        for key in self.keys:
+            values[self.cols[key]] = getattr(record, key)
+        self.struct.pack_into(dataFile.data, address, *values)
+        dataFile.dirty = True
+
+
+# Tables shared by both games
+COMMON = {
+    'Ability???.btb': SCHEMA('Magic', level=0, abilId=1, itemId=2),
+    'DetailInfoMagicTable.btb': SCHEMA('DetailInfoMagic', comId=0, detail=(2, 'text')),
+    'PcLevelTable???.btb': SCHEMA('PcLevel', totalEXP=1, nextEXP=2),
+    'CommandAbility.btb': SCHEMA('CommandAbility', id=0, name=(4, 'text')),
+}
+
+SCHEMAS = {
+    'BD': {
+        **COMMON,
+        'ItemTable.btb': SCHEMA('Item', id=0, order=3, name=(4, 'text'), icon=11, cost=17, sell=18),
+        'MonsterData.btb': SCHEMA('Monster', exp=91, jp=92, pg=93),
+        'JobTable.btb': SCHEMA('Job', index=1, name=(2, 'text')),
+        'JobTable??.btb': SCHEMA('JobLevel',
+            totalJP=1, nextJP=2,
+            hp=4, mp=5, str=6, vit=7, int=8, mnd=9, agi=10, dex=11,
+            specialty=12, abilId=13, jobComId=16,
+        ),
+        'SupportAbility.btb': SCHEMA('SupportAbility', id=0, jobId=2, name=(3, 'text'), cost=5),
+        'JobCommand.btb': SCHEMA('JobCommand', id=0, name=(1, 'text')),
+        '*.trb': SCHEMA('Treasure', itemId=1, money=2, num=3),
+    },
+    'BS': {
+        **COMMON,
+        'ItemTable.btb': SCHEMA('Item', id=0, order=3, name=(4, 'text'), icon=11, cost=19, sell=20),
+        'MonsterData.btb': SCHEMA('Monster', exp=111, exp2=112, jp=113, jp2=114, pg=115, pg2=116),
+        'JobTable.btb': SCHEMA('Job', name=(2, 'text')),
+        'JobTable??.btb': SCHEMA('JobLevel',
+            totalJP=1, nextJP=2,
+            hp=4, mp=5, str=6, vit=7, int=8, mnd=9, agi=10, dex=11,
+            specialty=12, abilId=13, jobComId=14, craftId=15,
+        ),
+        'SupportAbility.btb': SCHEMA('SupportAbility', id=0, jobId=2, name=(4, 'text'), cost=6),
+        'JobCommand.btb': SCHEMA('JobCommand', id=0, name=(2, 'text')),
+    },
+}
+
+def getSchema(fileName, game=None):
+    schemas = SCHEMAS[game] if game else COMMON
+    if fileName in schemas:
+        return schemas[fileName]
+    for pattern, schema in schemas.items():
+        if fnmatch(fileName, pattern):
+            return schema
+    raise KeyError(f"No schema for {fileName}")
@@ -1,3 +1,5 @@
+from Classes import buildTable
+
 class SHOP:
     def __init__(self, dataFiles):
         self.dataFiles = dataFiles
@@ -7,6 +9,8 @@ class SHOP:
         allMagic += list(range(50400, 50412)) # Bishop (omit Lvl. 7 Fate)
         allMagic += list(range(50500, 50508)) # Wizard
         allMagic += list(range(50600, 50612)) # Astrologian (omit Lvl. 7 Status Barrier)
+        counts = [0]*len(allMagic)
+        magicData = buildTable([allMagic, counts])
 
         for fileName, dataFile in self.dataFiles.crowdFiles.items():
             if fileName == 'ShopMasterTable_Magic.spb':
@@ -14,8 +18,7 @@ class SHOP:
             if fileName == 'ND_31_Magic.spb':
                 pass # DON'T CHANGE THE SHOP WITH LEVEL 7 SPELLS
             elif 'Magic.spb' in fileName:
-                counts = [0]*len(allMagic)
-                dataFile.updateData(allMagic, counts)
+                dataFile.setData(magicData)
 
 
 class SHOP_BD:
@@ -25,11 +28,12 @@ class SHOP_BD:
         ids = itemFile.readCol(0)
         allMagic = filter(lambda x: x >= 50000, ids)
         allMagic = list(filter(lambda x: x < 50218, allMagic) )
+        counts = [0]*len(allMagic)
+        magicData = buildTable([allMagic, counts])
 
         for fileName, dataFile in self.dataFiles.items():
             if fileName == 'ShopMasterTable_Magic.spb':
                 continue
             elif 'Magic.spb' in fileName:
-                counts = [0]*len(allMagic)
-                dataFile.updateData(allMagic, counts)
+                dataFile.setData(magicData)
                 
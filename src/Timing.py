@@ -0,0 +1,36 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Wall and CPU time of the phases of a run. CPU time is for the whole
+# process, so it includes worker threads and overlapping phases.
+class TIMER:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.cpuStart = time.process_time()
+        self.phases = []
+        self.lock = threading.Lock()
+
+    # Extra fields (bytes, ratios, ...) can be added to the yielded record
+    @contextmanager
+    def time(self, phase, archive=None):
+        record = {'phase': phase}
+        if archive:
+            record['archive'] = archive
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall'] = time.perf_counter() - wall
+            record['cpu'] = time.process_time() - cpu
+            with self.lock:
+                self.phases.append(record)
+
+    def report(self, **extra):
+        return {
+            'wall': time.perf_counter() - self.start,
+            'cpu': time.process_time() - self.cpuStart,
+            'phases': self.phases,
+            **extra,
+        }
@@ -1,21 +1,20 @@
 from copy import copy
-import random
+from Schemas import getSchema
 
 class TREASURES:
     def __init__(self, treasureFiles, items):
         self.items = items
         self.treasureFiles = copy(treasureFiles.crowdFiles)
         del self.treasureFiles['TreasureMessageTable.btb']
+        self.schema = getSchema('TW_10.trb', 'BD')
 
-    def shuffleTreasures(self):
+    def shuffleTreasures(self, rng):
         candidates = []
         isSlot = {}
         for fileName, table in self.treasureFiles.items():
-            itemID = table.readCol(1)
-            money = table.readCol(2)
-            num = table.readCol(3)
-            candidates += list(filter(lambda x: any(x), zip(itemID, money, num)))
-            isSlot[fileName] = {row:(any(x) and x[0] < 90000) for row, x in enumerate(zip(itemID, money, num))}
+            chests = [x.values() for x in self.schema.readRows(table)]
+            candidates += list(filter(lambda x: any(x), chests))
+            isSlot[fileName] = {row:(any(x) and x[0] < 90000) for row, x in enumerate(chests)}
         # Filter empty slots
         candidates = list(filter(lambda x: any(x), candidates))
 
@@ -30,27 +29,21 @@ class TREASURES:
         candidates = list(filter(lambda x: x[0] < 90000, candidates))
 
         # Randomize
-        random.shuffle(candidates)
+        rng.shuffle(candidates)
         for fileName, table in self.treasureFiles.items():
             for row in range(table.count):
                 if isSlot[fileName][row]:
-                    itemID, money, num = candidates.pop()
-                    table.patchValue(itemID, row, 1)
-                    table.patchValue(money, row, 2)
-                    table.patchValue(num, row, 3)
+                    chest = self.schema.record(*candidates.pop())
+                    self.schema.patchRow(table, row, chest)
 
         # Copy chests from airship (ch 6+) to ship (ch <6); exclude chest key
         tw_20 = self.treasureFiles['TW_20.trb'] # Airship ch 6+
         tw_14 = self.treasureFiles['TW_14.trb'] # Ship ch <6
         for row in range(7):
-            itemID = tw_20.readValue(row, 1)
-            money = tw_20.readValue(row, 2)
-            num = tw_20.readValue(row, 3)
-            tw_14.patchValue(itemID, row, 1)
-            tw_14.patchValue(money, row, 2)
-            tw_14.patchValue(num, row, 3)
+            chest = self.schema.readRow(tw_20, row)
+            self.schema.patchRow(tw_14, row, chest)
 
-    def print(self):
+    def print(self, file=None):
         self.fileToLoc = {
             'EV_10.trb': '????????? ("SmallAirShip")',
             'EV_15.trb': 'SS Funky Francisca',
@@ -90,32 +83,32 @@ class TREASURES:
             'TW_20.trb': 'Grandship (Airship, Ch. 6+)'
         }
         
-        print('=========')
-        print('TREASURES')
-        print('=========')
-        print('')
-        print('')
+        print('=========', file=file)
+        print('TREASURES', file=file)
+        print('=========', file=file)
+        print('', file=file)
+        print('', file=file)
         for fileName, location in self.fileToLoc.items():
             table = self.treasureFiles[fileName]
-            itemID = table.readCol(1)
-            money = table.readCol(2)
-            num = table.readCol(3)
+            itemID = table.readCol(self.schema.col('itemId'))
+            money = table.readCol(self.schema.col('money'))
+            num = table.readCol(self.schema.col('num'))
             
-            print(location)
-            print('-'*len(location))
-            print('')
+            print(location, file=file)
+            print('-'*len(location), file=file)
+            print('', file=file)
             for i, m, n in zip(itemID, money, num):
                 if not any([i, m, n]):
                     continue
                 if m:
-                    print('  ', f"{m} pg")
+                    print('  ', f"{m} pg", file=file)
                 elif n > 2:
-                    print('  ', self.items.getName(i), f"x{n}")
+                    print('  ', self.items.getName(i), f"x{n}", file=file)
                 else:
-                    print('  ', self.items.getName(i))
-            print('')
-            print('')
-        print('')
-        print('')
-        print('')
+                    print('  ', self.items.getName(i), file=file)
+            print('', file=file)
+            print('', file=file)
+        print('', file=file)
+        print('', file=file)
+        print('', file=file)
             
@@ -1,5 +1,6 @@
 import sys
 import os
+import hashlib
 
 # Required for pyinstaller
 def get_filename(relative_path):
@@ -11,3 +12,11 @@ def get_filename(relative_path):
     return filename
 
     
+
+# SHA-256 of a file, read in chunks
+def hashFile(fileName, chunkSize=1<<20):
+    digest = hashlib.sha256()
+    with open(fileName, 'rb') as file:
+        while chunk := file.read(chunkSize):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,112 @@
+import os
+import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from Utilities import hashFile
+
+# Checking a romfs against the digests in sha.json (game -> {file: sha256}).
+# Digests are remembered in a sidecar file by (path, size, mtime, inode),
+# so files that haven't changed since they were checked aren't hashed again.
+
+lock = threading.Lock()
+
+# Default sidecar file
+ROM_CHECKS = 'romfs_checks.json'
+
+def loadChecks(cacheFile):
+    try:
+        with open(cacheFile, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def saveChecks(cacheFile, checks):
+    directory = os.path.dirname(os.path.abspath(cacheFile))
+    try:
+        fd, temp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(checks, file)
+        os.replace(temp, cacheFile)
+    except OSError:
+        pass # Only costs hashing again next time
+
+def statKey(stat):
+    return [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+# Games whose files all exist, with the stats of their files. Only
+# these get hashed.
+def candidates(path, digests):
+    games = {}
+    for game, files in digests.items():
+        stats = {}
+        for fileName in files:
+            try:
+                stats[fileName] = os.stat(os.path.join(path, fileName))
+            except OSError:
+                break
+        else:
+            games[game] = stats
+    return games
+
+# Digest of a file, hashed only if it changed since it was last hashed
+def fileDigest(path, fileName, stat, checks):
+    fullName = os.path.abspath(os.path.join(path, fileName))
+    key = statKey(stat)
+    with lock:
+        cached = checks.get(fullName)
+    if cached and cached['stat'] == key:
+        return cached['sha256']
+    digest = hashFile(fullName)
+    with lock:
+        checks[fullName] = {'stat': key, 'sha256': digest}
+    return digest
+
+# Whether every file of a game has its digest. Files are hashed in
+# parallel; the first mismatch cancels the files still waiting.
+def checkGame(path, files, stats, checks, workers=None):
+    def check(fileName):
+        return fileDigest(path, fileName, stats[fileName], checks) == files[fileName]
+
+    executor = ThreadPoolExecutor(workers)
+    try:
+        futures = [executor.submit(check, fileName) for fileName in files]
+        for future in as_completed(futures):
+            if not future.result():
+                return False
+        return True
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+# The game of the unmodified romfs at path, or False
+def checkROM(path, digests, cacheFile=None, workers=None):
+    checks = loadChecks(cacheFile) if cacheFile else {}
+    try:
+        for game, stats in candidates(path, digests).items():
+            if checkGame(path, digests[game], stats, checks, workers):
+                return game
+        return False
+    finally:
+        if cacheFile:
+            saveChecks(cacheFile, checks)
+
+# The digests the files of game actually have at path (whether or not
+# they match sha.json), or None if any of them is missing
+def romDigests(path, game, digests, cacheFile=None, workers=None):
+    if not digests.get(game):
+        return None
+    return fileDigests(path, digests[game], cacheFile, workers)
+
+# Digests of fileNames under path, or None if any of them is missing
+def fileDigests(path, fileNames, cacheFile=None, workers=None):
+    stats = candidates(path, {None: fileNames}).get(None)
+    if stats is None:
+        return None
+    checks = loadChecks(cacheFile) if cacheFile else {}
+    try:
+        with ThreadPoolExecutor(workers) as executor:
+            futures = {f: executor.submit(fileDigest, path, f, stat, checks) for f, stat in stats.items()}
+        return {fileName: future.result() for fileName, future in futures.items()}
+    finally:
+        if cacheFile:
+            saveChecks(cacheFile, checks)